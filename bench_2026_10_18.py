@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import argparse
+import functools
+import importlib
+import numpy as np
+import sink_2026_10_18 as sink
+
+# Time the frames of every sketch without writing them anywhere.
+#
+# Every sketch runs in this process through its render function, into
+# a null sink, at each size asked for. The first frame is reported on
+# its own, since it pays for imports and setup, and the rest give the
+# per-frame percentiles and throughput. A still like the brush map
+# draws one frame, so it only has a first frame. A sketch that raises
+# fails the run, and then no baseline is saved.
+#
+# The dots_ pair draws the same 10k dots with cairo and with the splat
+# backend, to check that splat stays the faster one.
+#
+#   python bench_2026_10_18.py --frames 30 --size 256 --size 512
+#   python bench_2026_10_18.py daily_2022_07_09 --save
+#   python bench_2026_10_18.py dots_cairo dots_splat --size 512
+
+BASELINE = 'bench_2026_10_18.json'
+
+class Stopwatch(sink.NullSink):
+  """
+  A null sink that notes when every frame arrives.
+  """
+  def __init__(self):
+    self.times = [time.perf_counter()]
+    super().__init__()
+
+  def write_data(self, data, width, height, stride):
+    self.times.append(time.perf_counter())
+    super().write_data(data, width, height, stride)
+
+def run_img(name, app, width, height, frames, framerate):
+  # Apps drawn by img_2022_07_09.render, in this process.
+  import img_2022_07_09 as img
+  sketch = importlib.import_module(name)
+  output = Stopwatch()
+  img.render(
+    app=getattr(sketch, app),
+    width=width,
+    height=height,
+    framerate=framerate,
+    length=frames/framerate,
+    output=output,
+    seed=0,
+    workers=1,
+  )
+  return output.times
+
+def run_render(name, width, height, frames, framerate):
+  # Sketches with render(width, height, framerate, length, output).
+  sketch = importlib.import_module(name)
+  output = Stopwatch()
+  sketch.render(
+    width=width,
+    height=height,
+    framerate=framerate,
+    length=frames/framerate,
+    output=output,
+  )
+  return output.times
+
+def run_brushmap_2022_07_10(width, height, frames, framerate):
+  import brushmap_2022_07_10 as sketch
+  output = Stopwatch()
+  sketch.render(
+    width=width, height=height, output=output, seed=0, workers=1)
+  return output.times
+
+def run_dots(width, height, frames, framerate, backend, count=10000):
+  # The same antialiased dots every frame, 4px in radius at 512x512,
+  # either one cairo fill at a time like the brushes' draw_dot or
+  # splatted in one batch.
+  import cairo
+  import splat_2026_10_18 as splat
+  rng = np.random.default_rng(0)
+  centers = rng.uniform(-1, 1, (count, 2))
+  radii = np.full(count, 4/256)
+  colors = rng.uniform(0, 1, (count, 4))
+  surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+  context = cairo.Context(surface)
+  context.translate(width/2, height/2)
+  context.scale(min(width, height)/2, min(width, height)/2)
+  output = Stopwatch()
+  for _ in range(0, frames):
+    context.set_source_rgb(0, 0, 0)
+    context.paint()
+    if backend == 'splat':
+      splat.splat(surface, context.get_matrix(), centers, radii, colors)
+    else:
+      for (x, y), radius, color in zip(centers, radii, colors):
+        context.new_path()
+        context.set_source_rgba(*color)
+        context.arc(x, y, radius, 0, 2*np.pi)
+        context.fill()
+    surface.flush()
+    output.write_data(surface.get_data(), width, height, surface.get_stride())
+  return output.times
+
+SKETCHES = {
+  'daily_2022_07_01': functools.partial(
+    run_img, 'daily_2022_07_01', 'app_2022_07_01'),
+  'daily_2022_07_09': functools.partial(run_img, 'daily_2022_07_09', 'app'),
+  'daily_2022_07_07': functools.partial(run_render, 'daily_2022_07_07'),
+  'daily_2022_07_08_image': functools.partial(
+    run_render, 'daily_2022_07_08_image'),
+  'daily_2022_06_16_tixy': functools.partial(
+    run_render, 'daily_2022_06_16_tixy'),
+  'brushmap_2022_07_10': run_brushmap_2022_07_10,
+  'dots_cairo': functools.partial(run_dots, backend='cairo'),
+  'dots_splat': functools.partial(run_dots, backend='splat'),
+}
+
+def measure(name, width, height, frames, framerate=15):
+  """
+  Render a sketch and summarize how long its frames took. A run of
+  one frame has no percentiles or throughput.
+  """
+  times = np.array(SKETCHES[name](width, height, frames, framerate))
+  step = np.diff(times)
+  if len(step) == 0:
+    raise Exception(f'bench: {name} drew nothing')
+  rest = step[1:]
+  result = {
+    'sketch': name,
+    'width': width,
+    'height': height,
+    'frames': len(step),
+    'first': step[0],
+    'p50': None,
+    'p95': None,
+    'fps': None,
+  }
+  if len(rest):
+    result['p50'] = np.percentile(rest, 50)
+    result['p95'] = np.percentile(rest, 95)
+    result['fps'] = len(rest)/np.sum(rest)
+  return result
+
+def key(result):
+  return f"{result['sketch']}@{result['width']}x{result['height']}"
+
+def report(results, baseline, tolerance):
+  """
+  Print a table of results, each against its baseline if there is one,
+  and return the keys whose median frame got slower than tolerance.
+  """
+  slower = []
+  print(
+    f"{'sketch':<32}{'frames':>7}{'first ms':>10}{'p50 ms':>9}"
+    f"{'p95 ms':>9}{'fps':>8}{'vs base':>9}"
+  )
+  for result in results:
+    change = ''
+    before = baseline.get(key(result), {}).get('p50')
+    if before is not None and result['p50'] is not None:
+      ratio = result['p50']/before-1
+      change = f'{ratio:+.0%}'
+      if ratio > tolerance:
+        slower.append(key(result))
+        change += ' !'
+    p50, p95, fps = '-', '-', '-'
+    if result['p50'] is not None:
+      p50 = f"{1000*result['p50']:.1f}"
+      p95 = f"{1000*result['p95']:.1f}"
+      fps = f"{result['fps']:.1f}"
+    print(
+      f"{key(result):<32}{result['frames']:>7}"
+      f"{1000*result['first']:>10.1f}{p50:>9}{p95:>9}{fps:>8}{change:>9}"
+    )
+  return slower
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Time sketch frames.')
+  parser.add_argument('sketch', nargs='*', help=', '.join(SKETCHES))
+  parser.add_argument('--frames', type=int, default=30)
+  parser.add_argument('--framerate', type=int, default=15)
+  parser.add_argument('--size', type=int, action='append')
+  parser.add_argument('--baseline', default=BASELINE)
+  parser.add_argument('--tolerance', type=float, default=0.1)
+  parser.add_argument('--save', action='store_true')
+  args = parser.parse_args(argv)
+
+  names = args.sketch or list(SKETCHES)
+  for name in names:
+    if name not in SKETCHES:
+      parser.error(f'no sketch {name}')
+  sizes = args.size or [256]
+  results = []
+  failed = []
+  for name in names:
+    for size in sizes:
+      try:
+        results.append(measure(name, size, size, args.frames, args.framerate))
+      except Exception as error:
+        print(f'{name}: {error}', file=sys.stderr)
+        failed.append(f'{name}@{size}x{size}')
+
+  baseline = {}
+  if os.path.exists(args.baseline):
+    with open(args.baseline) as file:
+      baseline = json.load(file)
+  slower = report(results, baseline, args.tolerance)
+  if failed:
+    # A baseline missing the sketches that crashed would pass them from
+    # then on, so it isn't saved.
+    print(f"failed: {', '.join(failed)}", file=sys.stderr)
+    return 1
+  if args.save:
+    for result in results:
+      baseline[key(result)] = {
+        name: value.item() if isinstance(value, np.generic) else value
+        for name, value in result.items()
+      }
+    with open(args.baseline, 'w') as file:
+      json.dump(baseline, file, indent=2, sort_keys=True)
+  elif slower:
+    print(f"slower than baseline: {', '.join(slower)}", file=sys.stderr)
+    return 1
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -2,20 +2,23 @@ import sys
 import math
 import cairo
 import numpy as np
-from scipy.special import softmax
 from typing import Callable
+import img_2022_07_09
+import sink_2026_10_18 as sink
 
 tau = 2*math.pi
 
 def k(value):
-  def closure(time):
-    return value
+  def closure(time, count=None):
+    if count is None:
+      return value
+    return np.full(count, value)
   return closure
 
-def sample(xs, prob):
-  rng = np.random.default_rng()
-  def closure(time):
-    return rng.choice(xs, p=prob)
+def sample(xs, prob, rng=None):
+  rng = rng or np.random.default_rng()
+  def closure(time, count=None):
+    return rng.choice(xs, size=count, p=prob)
   return closure
 
 def color_pastel_pink():
@@ -23,26 +26,39 @@ def color_pastel_pink():
     return (232/255, 158/255, 159/255, 1.0)
   return closure
 
-def draw(img, brush_map, brush_lib):
-  rng = np.random.default_rng()
+def choose(brush_map, rng=None):
+  """
+  Sample a brush index for every cell of a (rows, cols, brushes) map of
+  logits at once. The argmax of logits plus Gumbel noise is distributed
+  as softmax(logits), so this matches choosing cell by cell.
+  """
+  rng = rng or np.random.default_rng()
+  noise = rng.gumbel(size=brush_map.shape)
+  return np.argmax(brush_map+noise, axis=-1)
+
+def draw(img, brush_map, brush_lib, rng=None, time=0):
   rows, cols, _ = brush_map.shape
   cell_height = 2/rows
   cell_width = 2/cols
   max_radius = cell_height/2
-  for row in range(0, rows):
-    dy = row/rows
-    ndc_y = 2*dy-1+max_radius
-    for col in range(0, cols):
-      dx = col/cols
-      ndc_x = 2*dx-1+max_radius
-      brush_logits = brush_map[row, col, :]
-      brush_prob = softmax(brush_logits)
-      brush = rng.choice(brush_lib, p=brush_prob)
-      img.save()
-      img.translate(ndc_x, ndc_y)
-      img.scale(cell_width/2, cell_height/2)
-      brush.draw(0, img)
-      img.restore()
+  row, col = np.mgrid[0:rows, 0:cols]
+  ndc_y = 2*(row/rows)-1+max_radius
+  ndc_x = 2*(col/cols)-1+max_radius
+  choice = choose(brush_map, rng)
+  # Cells don't overlap, so drawing them grouped by brush looks the
+  # same as drawing them in order, and every brush draws one batch.
+  for index, brush in enumerate(brush_lib):
+    chosen = choice == index
+    if not chosen.any():
+      continue
+    brush.draw_batch(
+      time,
+      img,
+      ndc_x[chosen],
+      ndc_y[chosen],
+      cell_width/2,
+      cell_height/2,
+    )
 
 class NilBrush:
   def __init__(self):
@@ -51,6 +67,9 @@ class NilBrush:
   def draw(self, time, img):
     pass
 
+  def draw_batch(self, time, img, xs, ys, scale_x, scale_y):
+    pass
+
 class DotBrush:
   rgba: Callable[[float], np.ndarray]
   size: Callable[[float], float]
@@ -67,34 +86,71 @@ class DotBrush:
     img.arc(0, 0, size, 0, tau)
     img.fill()
 
-if __name__ == '__main__':
-  surface_width = 256
-  surface_height = 256
-  surface = cairo.ImageSurface(
-    cairo.FORMAT_ARGB32,
-    surface_width,
-    surface_height,
-  )
-  context = cairo.Context(surface)
-  grid_rows = 16
-  grid_cols = 16
-  rng = np.random.default_rng()
-  brush_lib = [
+  def draw_batch(self, time, img, xs, ys, scale_x, scale_y):
+    # One color and one fill for every instance; each dot is its own
+    # subpath, scaled into its cell.
+    r, g, b, a = self.rgba(time)
+    sizes = self.size(time, len(xs))
+    img.new_path()
+    img.set_source_rgba(r, g, b, a)
+    for x, y, size in zip(xs, ys, sizes):
+      img.save()
+      img.translate(x, y)
+      img.scale(scale_x, scale_y)
+      img.new_sub_path()
+      img.arc(0, 0, size, 0, tau)
+      img.restore()
+    img.fill()
+
+def brush_lib(rng):
+  return [
     NilBrush(),
     DotBrush(
       color_pastel_pink(),
-      sample([1, 1, 1], [0.5, 0.3, 0.2]),
+      sample([1, 1, 1], [0.5, 0.3, 0.2], rng),
     ),
   ]
+
+def app(rng):
+  grid_rows = 16
+  grid_cols = 16
   brush_map = rng.standard_normal(
-    (grid_rows, grid_cols, len(brush_lib)),
+    (grid_rows, grid_cols, len(brush_lib(rng))),
+  )
+  def draw_frame(time):
+    # Brushes sample from the frame's generator, so every tile of a
+    # frame draws the same dots.
+    frame_rng = img_2022_07_09.rng()
+    context = img_2022_07_09.context()
+    context.set_source_rgb(49/255, 57/255, 60/255)
+    context.paint()
+    draw(context, brush_map, brush_lib(frame_rng), frame_rng, time)
+  return draw_frame
+
+def render(
+  width: int = 256,
+  height: int = 256,
+  output: sink.Sink = None,
+  seed: int = None,
+  workers: int = None,
+  tiles: tuple = None,
+):
+  """
+  Draw one frame of a random brush map into a sink, a raw frame on
+  standard output by default. With tiles set to (cols, rows), a print
+  size frame is drawn in parallel tiles, as in img_2022_07_09.render.
+  """
+  img_2022_07_09.render(
+    app=app,
+    width=width,
+    height=height,
+    framerate=1,
+    length=1,
+    output=output,
+    seed=seed,
+    workers=workers,
+    tiles=tiles,
   )
-  context.set_source_rgb(49/255, 57/255, 60/255)
-  context.paint()
-  context.save()
-  context.translate(surface_width/2, surface_height/2)
-  context.scale(surface_width/2, surface_height/2)
-  draw(context, brush_map, brush_lib)
-  context.restore()
-  pixels = surface.get_data()
-  sys.stdout.buffer.write(pixels)
+
+if __name__ == '__main__':
+  render()
@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+import zlib
+import struct
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+# Rendered frames on disk, named by a hash of everything that went into
+# them, so a re-render only draws the frames whose inputs changed and
+# an interrupted render picks up where it stopped. Every frame is
+# zlib-compressed, with its size in a small header; files are written
+# whole and renamed into place, so a crash never leaves half a frame,
+# only a partial file that the next cache on the directory removes.
+
+_header = struct.Struct('<III')
+
+def digest(*parts) -> str:
+  """
+  Hash strings, bytes and anything with a stable repr into a key.
+  """
+  hasher = hashlib.sha256()
+  for part in parts:
+    if isinstance(part, str):
+      part = part.encode()
+    elif not isinstance(part, bytes):
+      part = repr(part).encode()
+    hasher.update(len(part).to_bytes(8, 'little'))
+    hasher.update(part)
+  return hasher.hexdigest()
+
+def source_digest(root: str = None) -> str:
+  """
+  Hash the source of every loaded module under root, this directory by
+  default, so editing any sketch or library module changes the keys.
+  """
+  root = os.path.abspath(root or os.path.dirname(__file__))
+  paths = set()
+  for module in list(sys.modules.values()):
+    path = getattr(module, '__file__', None)
+    if path is None or not path.endswith('.py'):
+      continue
+    path = os.path.abspath(path)
+    if os.path.dirname(path) == root:
+      paths.add(path)
+  parts = []
+  for path in sorted(paths):
+    with open(path, 'rb') as file:
+      parts += [os.path.basename(path), file.read()]
+  return digest(*parts)
+
+class FrameCache:
+  """
+  A directory of compressed frames, at most limit bytes. Reading a
+  frame marks it as recently used, and writing one past the limit
+  evicts the least recently used frames.
+  """
+  path: str
+  limit: int
+
+  def __init__(
+    self,
+    path: str = 'bin/cache',
+    limit: int = 1 << 30,
+    level: int = 1,
+  ):
+    self.path = path
+    self.limit = limit
+    self.level = level
+    self._lock = threading.Lock()
+    os.makedirs(path, exist_ok=True)
+    self._clean()
+    # The directory is read once; from then on an index of every frame
+    # by last use, oldest first, keeps eviction off the disk.
+    entries = sorted(
+      (entry.stat().st_mtime, entry.name, entry.stat().st_size)
+      for entry in self._entries()
+    )
+    self._index = OrderedDict((name, size) for _, name, size in entries)
+    self._size = sum(self._index.values())
+
+  def seed(self) -> int:
+    """
+    A seed kept in the directory, made on first use. Renders that don't
+    pick a seed use it, so their frames are found again next time.
+    """
+    path = os.path.join(self.path, 'seed')
+    if not os.path.exists(path):
+      partial = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+      with open(partial, 'w') as file:
+        file.write(str(secrets.randbits(128)))
+      try:
+        # Linking never replaces a seed another render made first.
+        os.link(partial, path)
+      except FileExistsError:
+        pass
+      finally:
+        os.remove(partial)
+    with open(path) as file:
+      return int(file.read())
+
+  def get(self, key: str):
+    """
+    Return (data, width, height, stride) of a frame, or None.
+    """
+    path = self._path(key)
+    try:
+      with open(path, 'rb') as file:
+        blob = file.read()
+      os.utime(path)
+    except FileNotFoundError:
+      return None
+    with self._lock:
+      if os.path.basename(path) in self._index:
+        self._index.move_to_end(os.path.basename(path))
+    width, height, stride = _header.unpack_from(blob)
+    data = zlib.decompress(blob[_header.size:])
+    return data, width, height, stride
+
+  def put(
+    self,
+    key: str,
+    data: bytes,
+    width: int,
+    height: int,
+    stride: int,
+  ):
+    blob = _header.pack(width, height, stride)
+    blob += zlib.compress(data, self.level)
+    path = self._path(key)
+    name = os.path.basename(path)
+    partial = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(partial, 'wb') as file:
+      file.write(blob)
+    with self._lock:
+      os.replace(partial, path)
+      self._size += len(blob)-self._index.pop(name, 0)
+      self._index[name] = len(blob)
+      if self._size > self.limit:
+        self._evict()
+
+  def _evict(self):
+    while self._size > self.limit and self._index:
+      name, size = self._index.popitem(last=False)
+      self._size -= size
+      try:
+        os.remove(os.path.join(self.path, name))
+      except FileNotFoundError:
+        pass
+
+  def _clean(self):
+    # Partial files of a crashed render. A live one is only a few
+    # milliseconds old, so anything older than a minute is left over.
+    stale = time.time()-60
+    with os.scandir(self.path) as entries:
+      for entry in entries:
+        if entry.name.endswith('.tmp') and entry.stat().st_mtime < stale:
+          try:
+            os.remove(entry.path)
+          except FileNotFoundError:
+            pass
+
+  def _entries(self):
+    with os.scandir(self.path) as entries:
+      return [entry for entry in entries if entry.name.endswith('.frame')]
+
+  def _path(self, key):
+    return os.path.join(self.path, f'{key}.frame')
@@ -0,0 +1,61 @@
+import os
+import time
+import numpy as np
+from cache_2026_10_18 import FrameCache, digest
+
+# Run with python -m pytest cache_2026_10_18_test.py.
+
+def frame(seed, size=1000):
+  # Random bytes don't compress, so every frame takes about size bytes.
+  return np.random.default_rng(seed).bytes(size)
+
+def test_digest_separates_its_parts():
+  assert digest('ab', 'c') != digest('a', 'bc')
+  assert digest('a', 1) == digest('a', 1)
+
+def test_frames_round_trip(tmp_path):
+  cache = FrameCache(str(tmp_path))
+  data = frame(0)
+  cache.put('key', data, 10, 25, 40)
+  assert cache.get('key') == (data, 10, 25, 40)
+  assert cache.get('other') is None
+  assert FrameCache(str(tmp_path)).get('key') == (data, 10, 25, 40)
+
+def test_least_recently_used_frame_is_evicted(tmp_path):
+  cache = FrameCache(str(tmp_path), limit=2500)
+  cache.put('a', frame(0), 1000, 1, 1000)
+  cache.put('b', frame(1), 1000, 1, 1000)
+  assert cache.get('a') is not None
+  cache.put('c', frame(2), 1000, 1, 1000)
+  assert cache.get('b') is None
+  assert cache.get('a') is not None
+  assert cache.get('c') is not None
+
+def test_reopened_cache_evicts_by_last_use(tmp_path):
+  cache = FrameCache(str(tmp_path))
+  for index, key in enumerate(['a', 'b', 'c']):
+    cache.put(key, frame(index), 1000, 1, 1000)
+    stamp = time.time()-100+index
+    os.utime(tmp_path/f'{key}.frame', (stamp, stamp))
+  cache = FrameCache(str(tmp_path), limit=2500)
+  cache.put('d', frame(3), 1000, 1, 1000)
+  assert [cache.get(key) is None for key in 'abcd'] == [
+    True, True, False, False]
+
+def test_stale_partial_files_are_removed(tmp_path):
+  stale = tmp_path/'a.frame.1.2.tmp'
+  fresh = tmp_path/'b.frame.1.2.tmp'
+  stale.write_bytes(b'partial')
+  fresh.write_bytes(b'partial')
+  stamp = time.time()-120
+  os.utime(stale, (stamp, stamp))
+  FrameCache(str(tmp_path))
+  assert not stale.exists()
+  assert fresh.exists()
+
+def test_seed_is_kept_in_the_directory(tmp_path):
+  seed = FrameCache(str(tmp_path)).seed()
+  assert FrameCache(str(tmp_path)).seed() == seed
+  assert FrameCache(str(tmp_path/'other')).seed() != seed
+  # No partial seed file is left behind.
+  assert sorted(path.name for path in tmp_path.iterdir()) == ['other', 'seed']
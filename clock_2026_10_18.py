@@ -0,0 +1,62 @@
+import math
+import zlib
+from fractions import Fraction
+
+# The clocks in these sketches are sums of sines at rational
+# frequencies, so an animation made of them repeats exactly after the
+# least common period of its frequencies. Once that many frames are
+# drawn, the rest of a render can cycle through them.
+
+def loop_period(frequencies, limit: int = 1000) -> Fraction:
+  """
+  The least time, in seconds, in which every frequency (in cycles per
+  second) runs a whole number of cycles. Floats like 1/3 are read as
+  the nearest fraction with a denominator up to limit.
+  """
+  fractions = [
+    abs(Fraction(frequency).limit_denominator(limit))
+    for frequency in frequencies
+  ]
+  fractions = [fraction for fraction in fractions if fraction != 0]
+  if not fractions:
+    return Fraction(0)
+  # f = p/q runs whole cycles in multiples of q/p; all of them at once
+  # in multiples of lcm(q)/gcd(p).
+  numerator = math.gcd(*[fraction.numerator for fraction in fractions])
+  denominator = math.lcm(*[fraction.denominator for fraction in fractions])
+  return Fraction(denominator, numerator)
+
+def loop_frames(period, framerate) -> int:
+  """
+  The least number of frames after which a render at framerate shows
+  the same times modulo period again; 1 for a still picture.
+  """
+  span = Fraction(period)*Fraction(framerate).limit_denominator()
+  return max(1, span.numerator)
+
+class FrameLoop:
+  """
+  Keep the frames of one period, compressed, and replay them in order.
+  """
+  count: int
+
+  def __init__(self, count: int):
+    assert count > 0
+    self.count = count
+    self._frames = []
+
+  def full(self) -> bool:
+    return len(self._frames) >= self.count
+
+  def keep(self, data: bytes, width: int, height: int, stride: int):
+    if not self.full():
+      self._frames.append((zlib.compress(data, 1), width, height, stride))
+
+  def replay(self, output, start: int, stop: int):
+    """
+    Write frames start up to stop to a sink, each the kept frame at the
+    same place in the period.
+    """
+    for frame in range(start, stop):
+      data, width, height, stride = self._frames[frame%self.count]
+      output.write_data(zlib.decompress(data), width, height, stride)
@@ -0,0 +1,33 @@
+from fractions import Fraction
+from clock_2026_10_18 import FrameLoop, loop_frames, loop_period
+
+# Run with python -m pytest clock_2026_10_18_test.py.
+
+def test_loop_period():
+  assert loop_period([1, 1/2, 1/3, 1/6]) == 6
+  assert loop_period([2, 3]) == 1
+  assert loop_period([2/3, 4/5]) == Fraction(15, 2)
+  assert loop_period([-1/2, 0]) == 2
+  assert loop_period([]) == 0
+
+def test_loop_frames():
+  assert loop_frames(loop_period([1, 1/2, 1/3, 1/6]), 15) == 90
+  assert loop_frames(Fraction(1, 3), 10) == 10
+  assert loop_frames(0, 15) == 1
+
+class Recorder:
+  def __init__(self):
+    self.frames = []
+
+  def write_data(self, data, width, height, stride):
+    self.frames.append((data, width, height, stride))
+
+def test_frame_loop_replays_in_period_order():
+  loop = FrameLoop(3)
+  for index in range(0, 4):
+    loop.keep(bytes([index])*8, 2, 1, 8)
+  assert loop.full()
+  output = Recorder()
+  loop.replay(output, 3, 8)
+  assert [data[0] for data, *_ in output.frames] == [0, 1, 2, 0, 1]
+  assert output.frames[0][1:] == (2, 1, 8)
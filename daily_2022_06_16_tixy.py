@@ -2,6 +2,8 @@ import sys
 import math
 import cairo
 import numpy as np
+import sink_2026_10_18 as sink
+import symmetry_2026_10_18 as symmetry
 
 tau = 2*np.pi
 
@@ -26,11 +28,21 @@ def set_color_white(ctx: cairo.Context):
 def relu(x):
   return np.maximum(x, 0)
 
-if __name__ == '__main__':
-  # An implementation of https://tixy.land, using a random residual
-  # network instead of a JavaScript function.
+def render(
+  width: int = 256,
+  height: int = 256,
+  framerate: int = 15,
+  length: float = 6,
+  output: sink.Sink = None,
+  rng: np.random.Generator = None,
+):
+  """
+  An implementation of https://tixy.land, using a random residual
+  network instead of a JavaScript function. Draws length seconds of
+  frames into a sink, raw frames on standard output by default.
+  """
   dim = 6
-  rng = np.random.default_rng()
+  rng = rng or np.random.default_rng()
   map_fst = rng.standard_normal((dim, dim))
   map_snd = rng.standard_normal((dim, dim))
   add_fst = rng.standard_normal(dim)
@@ -96,11 +108,7 @@ if __name__ == '__main__':
         ctx.fill()
 
   # Application parameters.
-  dspw = 256
-  dsph = 256
-  length = 6
-  framerate = 15
-  frame_count = framerate*length
+  frame_count = round(framerate*length)
   dt = 1/framerate
   rows = 16
   cols = 16
@@ -108,9 +116,10 @@ if __name__ == '__main__':
   origin = np.zeros(2+2+2)
 
   img = cairo.ImageSurface(
-    cairo.FORMAT_ARGB32, dspw, dsph)
+    cairo.FORMAT_ARGB32, width, height)
   ctx = cairo.Context(img)
   frame = 0
+  output = output or sink.RawSink()
 
   while frame < frame_count:
     time = clock(frame/framerate)
@@ -120,8 +129,8 @@ if __name__ == '__main__':
 
     # Enter normalized device coordinates.
     ctx.save()
-    ctx.translate(dspw/2, dsph/2)
-    ctx.scale(dspw/2, dsph/2)
+    ctx.translate(width/2, height/2)
+    ctx.scale(width/2, height/2)
 
     # Draw a border.
     ctx.scale(0.95, 0.95)
@@ -132,43 +141,23 @@ if __name__ == '__main__':
     ctx.stroke()
     ctx.scale(0.95, 0.95)
 
-    # Draw a color field in the upper left corner of the display.
-    ctx.save()
-    ctx.translate(-0.5, -0.5)
-    ctx.scale(0.5, 0.5)
-    draw_color_field(time, origin, ctx)
-    ctx.restore()
-
-    # Draw a color field in the upper right corner of the display.
-    ctx.save()
-    ctx.translate(+0.5, -0.5)
-    ctx.scale(0.5, 0.5)
-    ctx.scale(-1, 1)
-    draw_color_field(time, origin, ctx)
-    ctx.restore()
-
-    # Draw a color field in the lower left corner of the display.
-    ctx.save()
-    ctx.translate(-0.5, +0.5)
-    ctx.scale(0.5, 0.5)
-    ctx.scale(1, -1)
-    draw_color_field(time, origin, ctx)
-    ctx.restore()
-
-    # Draw a color field in the lower right corner of the display.
-    ctx.save()
-    ctx.translate(+0.5, +0.5)
-    ctx.scale(0.5, 0.5)
-    ctx.scale(-1, -1)
-    draw_color_field(time, origin, ctx)
-    ctx.restore()
+    # Draw the color field once, then mirror it into every corner of
+    # the display.
+    field, field_ctx = symmetry.recording()
+    draw_color_field(time, origin, field_ctx)
+    symmetry.replicate(ctx, field, symmetry.quadrants())
 
     # Exit normalized device coordinates.
     ctx.restore()
 
-    # Write pixel data for this frame to standard output.
-    pixels = img.get_data()
-    sys.stdout.buffer.write(pixels)
+    # Hand this frame to the output sink, which writes it to standard
+    # output in the background.
+    output.write(img)
 
     # Advance time by one frame.
     frame += 1
+
+  output.close()
+
+if __name__ == '__main__':
+  render()
@@ -2,6 +2,8 @@ import sys
 import math
 import cairo
 import numpy as np
+import sink_2026_10_18 as sink
+import symmetry_2026_10_18 as symmetry
 
 tau = 2*np.pi
 
@@ -27,20 +29,18 @@ def relu(x):
   return np.maximum(x, 0)
 
 def pendulum(
-    time: float,
+    time: np.ndarray,
     param: np.ndarray,
 ) -> np.ndarray:
+  # Every time against every row of the (k, 4) table at once; the
+  # point for each time is the mean of the rows' residuals.
   height, width = param.shape
   factor = 1/height
-  point = np.array([0.0, 0.0])
-  for row in param:
-    xfreq, xphase, yfreq, yphase = row
-    residual = np.array([
-      np.cos(time*xfreq*tau+xphase),
-      np.sin(time*yfreq*tau+yphase),
-    ]) * factor
-    point += residual
-  return point
+  time = np.asarray(time)[..., None]
+  xfreq, xphase, yfreq, yphase = param.T
+  x = np.sum(np.cos(time*xfreq*tau+xphase), axis=-1) * factor
+  y = np.sum(np.sin(time*yfreq*tau+yphase), axis=-1) * factor
+  return np.stack([x, y], axis=-1)
 
 if __name__ == '__main__':
   dspw = 2**8
@@ -54,6 +54,7 @@ if __name__ == '__main__':
   rng = np.random.default_rng()
   param = rng.choice(freq, (4, 4))
   frame = 0
+  output = sink.RawSink()
 
   while frame < frame_count:
     time = frame/framerate
@@ -64,23 +65,21 @@ if __name__ == '__main__':
     ctx.translate(dspw/2, dsph/2)
     ctx.scale(dspw/2, dsph/2)
 
+    # Draw the trail once and mirror it across both axes.
     window = 0.25
     iterations = 512
-    for j in range(0, 4):
-      for i in range(0, iterations):
-        residual = (-window/2)+i*((1/iterations)*window)
-        x, y = pendulum(time+residual, param)
-        radius = 2/128
-        ctx.arc(x, y, radius, 0, tau)
-        set_color_super_pink(ctx)
-        ctx.fill()
-      if j%2 == 0:
-        ctx.scale(-1, 1)
-      else:
-        ctx.scale(1, -1)
+    trail, trail_ctx = symmetry.recording()
+    residual = (-window/2)+np.arange(0, iterations)*((1/iterations)*window)
+    for x, y in pendulum(time+residual, param):
+      radius = 2/128
+      trail_ctx.arc(x, y, radius, 0, tau)
+      set_color_super_pink(trail_ctx)
+      trail_ctx.fill()
+    symmetry.replicate(ctx, trail, symmetry.dihedral(2))
 
     ctx.restore()
 
-    pixels = img.get_data()
-    sys.stdout.buffer.write(pixels)
+    output.write(img)
     frame += 1
+
+  output.close()
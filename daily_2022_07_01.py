@@ -2,6 +2,8 @@ import sys
 import math
 import cairo
 import numpy as np
+import img_2022_07_09 as img
+import trace_2026_10_18 as trace
 
 tau = 2*np.pi
 
@@ -12,9 +14,8 @@ Tensor = np.ndarray
 tau = 2*math.pi
 nil = np.array([[0, 0]])
 
-_frame = 0
-_framerate = 0
-_surface = None
+# The context of the frame or tile being drawn, from img, and the brush
+# drawing with it.
 _context = None
 _brush = None
 
@@ -39,11 +40,9 @@ def use_brush(brush):
   global _brush
   _brush = brush
 
-def time():
-  return _frame/_framerate
-
 def clear():
-  _brush.clear()
+  with trace.span('raster'):
+    _brush.clear()
   
 def save():
   _context.save()
@@ -68,16 +67,19 @@ def dot(
   radius: Tensor = default_radius,
   color: Tensor = default_color,
 ):
-  _brush.dot(position, radius, color)
+  with trace.span('raster'):
+    _brush.dot(position, radius, color)
 
 def box(
   position: Tensor = default_position,
   size: Tensor = default_size,
 ):
-  _brush.box(position, size)
+  with trace.span('raster'):
+    _brush.box(position, size)
 
 def line(fst, snd):
-  _brush.line(fst, snd)
+  with trace.span('raster'):
+    _brush.line(fst, snd)
   
 class BasicBrush:
   def __init__(
@@ -173,55 +175,17 @@ def pendulum(
   rows:int=1,
   window:float=0.5,
 ) -> np.ndarray:
+  # Every sample time against every row of the parameter table at
+  # once, giving a (rows, 1, 2) stack of points.
   height, _, width = param.shape
   factor = 1/height
-  buf = []
-  for row in range(0, rows):
-    res = (-window/2)+row*((1/rows)*window)
-    point = np.array([[0.0, 0.0]])
-    for data in param:
-      xfreq, xphase, yfreq, yphase = data[0]
-      residual = np.array([[
-        np.cos((time+res)*xfreq*tau+xphase),
-        np.sin((time+res)*yfreq*tau+yphase),
-      ]]) * factor
-      point += residual
-    buf.append(point)
-  return np.array(buf)
+  res = (-window/2)+np.arange(0, rows)*((1/rows)*window)
+  sample = (time+res)[:, None]
+  xfreq, xphase, yfreq, yphase = np.reshape(param, (height, width)).T
+  x = np.sum(np.cos(sample*xfreq*tau+xphase), axis=1) * factor
+  y = np.sum(np.sin(sample*yfreq*tau+yphase), axis=1) * factor
+  return np.stack([x, y], axis=1)[:, None, :]
     
-def render(
-  app,
-  size: np.ndarray,
-  framerate: int=15,
-  length: int=6,
-):
-  global _surface
-  global _context
-  global _parameter
-  global _state
-  global _frame
-  global _framerate
-
-  width, height = size[0]
-  _surface = cairo.ImageSurface(
-    cairo.FORMAT_ARGB32,
-    width,
-    height,
-  )
-  _context = cairo.Context(_surface)
-
-  _frame = 0
-  _framerate = framerate
-  while _frame < _framerate*length:
-    _context.save()
-    _context.translate(width/2, height/2)
-    _context.scale(width/2, height/2)
-    next(app)
-    _context.restore()
-    pixels = _surface.get_data()
-    sys.stdout.buffer.write(pixels)
-    _frame += 1
-
 def relu(x):
   return np.maximum(x, 0)
 
@@ -231,7 +195,10 @@ def vec(value):
 def mat(*rows):
   return np.array([row for row in rows])
 
-def app_2022_07_01():
+# Every frequency the pendulums of app_2022_07_01 run at.
+FREQ = [1/1, 1/2, 1/3, 1/6]
+
+def app_2022_07_01(rng):
   pen_dark = BasicBrush(
     background=color_black,
     foreground=[
@@ -250,11 +217,9 @@ def app_2022_07_01():
   rows = 64
   cols = 64
   center = vec([0, 0])
-  radius = vec([2/rows/2])
   color  = vec([0.5, 0.5])
-  freq = np.array([1/1, 1/2, 1/3, 1/6])
+  freq = np.array(FREQ)
   phas = np.array([x/100 for x in range(0, 200)])
-  rng = np.random.default_rng()
   xfreq = rng.choice(freq, (4, 1, 1))
   xphas = rng.choice(phas, (4, 1, 1))
   yfreq = rng.choice(freq, (4, 1, 1))
@@ -265,24 +230,29 @@ def app_2022_07_01():
   )
 
   def draw_pendulum_group(
+    time,
     param=pendulum_param,
     rows:int=128,
     window:float=0.5,
   ):
     for i in range(0, 4):
-      for point in pendulum(
-        time=time(),
-        param=param,
-        rows=rows,
-        window=window,
-      ):
+      with trace.span('model'):
+        trail = pendulum(
+          time=time,
+          param=param,
+          rows=img.scaled(rows),
+          window=window,
+        )
+      for point in trail:
         dot(point, radius=vec([2/128]))
       if i%2 == 0:
         scale(vec([-1, 1]))
       else:
         scale(vec([1, -1]))
 
-  while True:
+  def draw(time):
+    global _context
+    _context = img.context()
     use_brush(pen_dark)
     clear()
 
@@ -302,7 +272,7 @@ def app_2022_07_01():
     # scale(vec([0.95, 0.95]))
 
     # use_brush(pen_dark)
-    draw_pendulum_group()
+    draw_pendulum_group(time)
     restore()
 
     save()
@@ -321,7 +291,7 @@ def app_2022_07_01():
     # scale(vec([0.95, 0.95]))
 
     # use_brush(pen_dark)
-    draw_pendulum_group()
+    draw_pendulum_group(time)
     restore()
 
     save()
@@ -340,12 +310,14 @@ def app_2022_07_01():
     # scale(vec([0.95, 0.95]))
 
     use_brush(image_brush)
-    for row in range(0, rows):
-      for col in range(0, cols):
-        y = (row/rows)*2-1
-        x = (col/cols)*2-1
+    grid_rows = img.scaled(rows)
+    grid_cols = img.scaled(cols)
+    for row in range(0, grid_rows):
+      for col in range(0, grid_cols):
+        y = (row/grid_rows)*2-1
+        x = (col/grid_cols)*2-1
         position = vec([x, y])
-        dot(position=position, radius=radius)
+        dot(position=position, radius=vec([2/grid_rows/2]))
     restore()
 
     save()
@@ -365,20 +337,26 @@ def app_2022_07_01():
     # scale(vec([0.95, 0.95]))
 
     use_brush(image_brush)
-    for row in range(0, rows):
-      for col in range(0, cols):
-        y = (row/rows)*2-1
-        x = (col/cols)*2-1
+    grid_rows = img.scaled(rows)
+    grid_cols = img.scaled(cols)
+    for row in range(0, grid_rows):
+      for col in range(0, grid_cols):
+        y = (row/grid_rows)*2-1
+        x = (col/grid_cols)*2-1
         position = vec([x, y])
-        dot(position=position, radius=radius)
+        dot(position=position, radius=vec([2/grid_rows/2]))
     restore()
-    yield
+
+  return draw
 
 if __name__ == '__main__':
-  render(
-    app=app_2022_07_01(),
-    # size=vec([256, 256]),
-    size=vec([1024,1024]),
+  img.render(
+    app=app_2022_07_01,
+    # width=256,
+    # height=256,
+    width=1024,
+    height=1024,
     framerate=15,
     length=6,
+    frequencies=FREQ,
   )
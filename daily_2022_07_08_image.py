@@ -1,11 +1,15 @@
 import sys
 import math
+import functools
 import cairo
 import nn_2022_07_07 as nn
 from nn_2022_07_07 import Tensor
 import numpy as np
 from loguru import logger as log
-import opensimplex as simplex
+import sink_2026_10_18 as sink
+import symmetry_2026_10_18 as symmetry
+from media_2026_10_18 import MediaSequence
+from noise_2026_10_18 import NoiseVolume
 
 tau = 2*math.pi
 DSPW = 256
@@ -13,9 +17,9 @@ DSPH = 256
 RATE = 15
 LEN = 6
 
-display = cairo.ImageSurface(
-  cairo.FORMAT_ARGB32, DSPW, DSPH)
-img = cairo.Context(display)
+# The surface being drawn and its context, set by render.
+display = None
+img = None
 
 def set_color_space_cadet():
   img.set_source_rgb(0.160, 0.160, 0.239)
@@ -60,32 +64,61 @@ def clock(time: float):
   ]
   return np.array([value])
 
-def draw_image(media, rows=64, cols=64):
-  rng = np.random.default_rng()
-  radius = 2/rows/2
+def sample_image(media, rows=64, cols=64, box=False):
+  """
+  Sample a surface down to a (rows, cols, 4) array of its BGRA pixels,
+  taking the top left pixel of every cell, or the mean of the cell.
+  """
   height = media.get_height()
   width = media.get_width()
-  pixels = media.get_data()
-  for row in range(0, rows):
-    pct_y = row/rows
-    buf_y = math.floor(pct_y*height)
-    ndc_y = 2*pct_y-1
-    for col in range(0, cols):
-      pct_x = col/cols
-      buf_x = math.floor(pct_x*width)
-      ndc_x = 2*pct_x-1
-      blue  = pixels[buf_y*width*4+buf_x*4+0]/255.0
-      green = pixels[buf_y*width*4+buf_x*4+1]/255.0
-      red   = pixels[buf_y*width*4+buf_x*4+2]/255.0
-      alpha = pixels[buf_y*width*4+buf_x*4+3]/255.0
-      img.new_path()
-      coin = simplex.noise3(time, ndc_x, ndc_y)
-      if abs(1-red)<1e-1 and coin < 0.3:
-        set_color_super_pink()
-      else:
-        img.set_source_rgba(red, green, blue, alpha)
-      img.rectangle(ndc_x, ndc_y, 2*radius, 2*radius)
-      img.fill()
+  stride = media.get_stride()
+  media.flush()
+  pixels = np.ndarray(
+    (height, stride//4, 4), dtype=np.uint8, buffer=media.get_data())
+  pixels = pixels[:, :width]
+  buf_y = np.arange(0, rows)*height//rows
+  buf_x = np.arange(0, cols)*width//cols
+  if not box:
+    return pixels[buf_y][:, buf_x]
+  total = np.add.reduceat(pixels.astype(np.uint32), buf_y, axis=0)
+  total = np.add.reduceat(total, buf_x, axis=1)
+  count_y = np.diff(np.append(buf_y, height))
+  count_x = np.diff(np.append(buf_x, width))
+  count = count_y[:, None, None]*count_x[None, :, None]
+  return (total//count).astype(np.uint8)
+
+def draw_image(media, rows=64, cols=64, recolor=None):
+  # Blit the sampled cells as a tiny surface scaled up over [-1, 1]
+  # with nearest filtering, instead of filling one rectangle per cell.
+  # recolor(cells, ndc_x, ndc_y) may rewrite cells before they're drawn.
+  radius = 2/rows/2
+  cells = np.ascontiguousarray(sample_image(media, rows, cols))
+  if recolor is not None:
+    ndc_y = 2*np.arange(0, rows)/rows-1
+    ndc_x = 2*np.arange(0, cols)/cols-1
+    recolor(cells, ndc_x, ndc_y)
+  mosaic = cairo.ImageSurface.create_for_data(
+    cells, cairo.FORMAT_ARGB32, cols, rows, cols*4)
+  pattern = cairo.SurfacePattern(mosaic)
+  pattern.set_filter(cairo.FILTER_NEAREST)
+  img.save()
+  img.translate(-1, -1)
+  img.scale(2*radius, 2*radius)
+  img.new_path()
+  img.set_source(pattern)
+  img.rectangle(0, 0, cols, rows)
+  img.fill()
+  img.restore()
+
+_super_pink_bgra = np.round(np.array([0.678, 0.360, 0.839, 1.0])*255)
+_super_pink_noise = NoiseVolume(period=LEN)
+
+def recolor_super_pink(time, cells, ndc_x, ndc_y):
+  # Noise picks some of the near-white cells to paint super pink.
+  coin = _super_pink_noise.sample(time, ndc_x[None, :], ndc_y[:, None])
+  red = cells[:, :, 2]/255.0
+  chosen = (abs(1-red)<1e-1) & (coin < 0.3)
+  cells[chosen] = _super_pink_bgra
 
 def draw_field(
   model,
@@ -95,115 +128,123 @@ def draw_field(
   cols: int = 16,
 ):
   max_radius = 2/rows/2
-  for row in range(0, rows):
-    dy = row/rows
-    for col in range(0, cols):
-      dx = col/cols
-      ndc_y = 2*dy-1+max_radius
-      ndc_x = 2*dx-1+max_radius
-      ndc_dist = math.sqrt(ndc_x**2+ndc_y**2)
-      if ndc_dist > 1:
-        continue
-      # ndc_dist = min(1, math.sqrt(ndc_x**2+ndc_y**2))
-      source = np.array([[ndc_x, ndc_y, 0, 0, 0]])
-      target = nn.apply(model, param, source+clock(time))
-      set_color_latent(target)
-      radius = min([
-        max_radius*radius_latent(target),
-#        max_radius,
-      ])
-      img.save()
-      img.rotate(tau*(time**ndc_dist))
-      # img.rotate(tau*((ndc_dist)**time))
-      img.new_path()
-      img.arc(ndc_x, ndc_y, radius, 0, tau)
-      img.fill()
-      img.restore()
-
-def draw_field_2x2(model, param, time, rows, cols):
-  img.save()
-  img.translate(-0.5, -0.5)
-  img.scale(0.5, 0.5)
-  draw_field(model, param, time, rows, cols)
-  img.restore()
-  
-  img.save()
-  img.translate(0.5, -0.5)
-  img.scale(0.5, 0.5)
-  img.scale(-1, 1)
-  draw_field(model, param, time, rows, cols)
-  img.restore()
-
-  img.save()
-  img.translate(-0.5, 0.5)
-  img.scale(0.5, 0.5)
-  img.scale(1, -1)
-  draw_field(model, param, time, rows, cols)
-  img.restore()
-
-  img.save()
-  img.translate(0.5, 0.5)
-  img.scale(0.5, 0.5)
-  img.scale(-1, -1)
-  draw_field(model, param, time, rows, cols)
-  img.restore()
+  row, col = np.mgrid[0:rows, 0:cols]
+  ndc_y = np.ravel(2*(row/rows)-1+max_radius)
+  ndc_x = np.ravel(2*(col/cols)-1+max_radius)
+  ndc_dist = np.sqrt(ndc_x**2+ndc_y**2)
+  # ndc_dist = np.minimum(1, np.sqrt(ndc_x**2+ndc_y**2))
+  inside = ndc_dist <= 1
+  ndc_x, ndc_y, ndc_dist = ndc_x[inside], ndc_y[inside], ndc_dist[inside]
+  # Evaluate the whole grid as one batch instead of one row per cell.
+  source = np.zeros((len(ndc_x), nn.DIM))
+  source[:, 0] = ndc_x
+  source[:, 1] = ndc_y
+  target = nn.apply(model, param, source+clock(time))
+  for index in range(0, len(ndc_x)):
+    latent = target[index:index+1]
+    set_color_latent(latent)
+    radius = min([
+      max_radius*radius_latent(latent),
+#      max_radius,
+    ])
+    img.save()
+    img.rotate(tau*(time**ndc_dist[index]))
+    # img.rotate(tau*((ndc_dist)**time))
+    img.new_path()
+    img.arc(ndc_x[index], ndc_y[index], radius, 0, tau)
+    img.fill()
+    img.restore()
+
+def record_field(model, param, time, rows, cols):
+  # draw_field draws with the global context, so point that at a
+  # recording surface while the field is drawn.
+  global img
+  display_img = img
+  field, img = symmetry.recording()
+  try:
+    draw_field(model, param, time, rows, cols)
+  finally:
+    img = display_img
+  return field
+
+def draw_field_2x2(model, param, time, rows, cols, field=None):
+  # Draw the field once and mirror the recording into each quadrant.
+  if field is None:
+    field = record_field(model, param, time, rows, cols)
+  symmetry.replicate(img, field, symmetry.quadrants())
       
-rows = 8
-cols = 8
-model = nn.dense
-param = nn.init(model)
-media = []
-for i in range(0, 165):
-  path = f'bin/daily_2022_07_08_frame-{i+1:03d}.png'
-  surf = cairo.ImageSurface.create_from_png(path)
-  media.append(surf)
-for frame in range(0, RATE*LEN):
-  time = frame/RATE
-  set_color_black()
-  img.paint()
-
-  img.save()
-  img.translate(DSPW/2, DSPH/2)
-  img.scale(DSPW/2, DSPH/2)
-
-  img.scale(0.95, 0.95)
-  set_color_white()
-  img.new_path()
-  img.set_line_width(2/256)
-  img.rectangle(-1, -1, 2, 2)
-  img.stroke()
-  img.scale(-0.95, 0.95)
-
-  img.save()
-  img.translate(-0.5, -0.5)
-  img.scale(0.5, 0.5)
-  img.scale(0.95, 0.95)
-  img.rotate(tau*(time/LEN))
-  draw_field_2x2(model, param, time, rows, cols)
-  img.restore()
-
-  img.save()
-  img.translate(0.5, 0.5)
-  img.scale(0.5, 0.5)
-  img.scale(-1, -1)
-  img.scale(0.95, 0.95)
-  img.rotate(tau*(time/LEN))
-  draw_field_2x2(model, param, time, rows, cols)
-  img.restore()
-
-  img.save()
-  img.translate(-0.5, 0.5)
-  img.scale(0.5, 0.5)
-  draw_image(media[frame])
-  img.restore()
-
-  img.save()
-  img.translate(0.5, -0.5)
-  img.scale(0.5, 0.5)
-  img.scale(-1, -1)
-  draw_image(media[frame])
-  img.restore()
-
-  img.restore()
-  pixels = display.get_data()
-  sys.stdout.buffer.write(pixels)
+def render(
+  width: int = DSPW,
+  height: int = DSPH,
+  framerate: int = RATE,
+  length: float = LEN,
+  output: sink.Sink = None,
+):
+  """
+  Draw length seconds of frames into a sink, raw frames on standard
+  output by default.
+  """
+  global display, img
+  display = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+  img = cairo.Context(display)
+  rows = 8
+  cols = 8
+  model = nn.dense
+  param = nn.init(model)
+  media = MediaSequence('bin/daily_2022_07_08_frame-{:03d}.png', 165)
+  output = output or sink.RawSink()
+  for frame in range(0, round(framerate*length)):
+    time = frame/framerate
+    recolor = functools.partial(recolor_super_pink, time)
+    field = record_field(model, param, time, rows, cols)
+    set_color_black()
+    img.paint()
+
+    img.save()
+    img.translate(width/2, height/2)
+    img.scale(width/2, height/2)
+
+    img.scale(0.95, 0.95)
+    set_color_white()
+    img.new_path()
+    img.set_line_width(2/256)
+    img.rectangle(-1, -1, 2, 2)
+    img.stroke()
+    img.scale(-0.95, 0.95)
+
+    img.save()
+    img.translate(-0.5, -0.5)
+    img.scale(0.5, 0.5)
+    img.scale(0.95, 0.95)
+    img.rotate(tau*(time/LEN))
+    draw_field_2x2(model, param, time, rows, cols, field)
+    img.restore()
+
+    img.save()
+    img.translate(0.5, 0.5)
+    img.scale(0.5, 0.5)
+    img.scale(-1, -1)
+    img.scale(0.95, 0.95)
+    img.rotate(tau*(time/LEN))
+    draw_field_2x2(model, param, time, rows, cols, field)
+    img.restore()
+
+    img.save()
+    img.translate(-0.5, 0.5)
+    img.scale(0.5, 0.5)
+    draw_image(media[frame], recolor=recolor)
+    img.restore()
+
+    img.save()
+    img.translate(0.5, -0.5)
+    img.scale(0.5, 0.5)
+    img.scale(-1, -1)
+    draw_image(media[frame], recolor=recolor)
+    img.restore()
+
+    img.restore()
+    output.write(display)
+  output.close()
+
+if __name__ == '__main__':
+  render()
@@ -5,6 +5,8 @@ import nn_2022_07_07 as nn
 from nn_2022_07_07 import Tensor
 import numpy as np
 from loguru import logger as log
+import sink_2026_10_18 as sink
+import symmetry_2026_10_18 as symmetry
 
 tau = 2*math.pi
 DSPW = 256
@@ -89,60 +91,53 @@ def draw_field(
   cols: int = 16,
 ):
   max_radius = 2/rows/2
-  for row in range(0, rows):
-    dy = row/rows
-    for col in range(0, cols):
-      dx = col/cols
-      ndc_y = 2*dy-1+max_radius
-      ndc_x = 2*dx-1+max_radius
-      ndc_dist = min(1, math.sqrt(ndc_x**2+ndc_y**2))
-      source = np.array([[ndc_x, ndc_y, 0, 0, 0]])
-      target = nn.apply(model, param, source+clock(time))
-      set_color_latent(target)
-      radius = min([
-        max_radius*radius_latent(target),
-#        max_radius,
-      ])
-      img.save()
-      img.rotate(tau*((ndc_dist)**time))
-      img.new_path()
-      img.arc(ndc_x, ndc_y, radius, 0, tau)
-      img.fill()
-      img.restore()
-
-def draw_field_2x2(model, param, time, rows, cols):
-  img.save()
-  img.translate(-0.5, -0.5)
-  img.scale(0.5, 0.5)
-  draw_field(model, param, time, rows, cols)
-  img.restore()
-  
-  img.save()
-  img.translate(0.5, -0.5)
-  img.scale(0.5, 0.5)
-  img.scale(-1, 1)
-  draw_field(model, param, time, rows, cols)
-  img.restore()
-
-  img.save()
-  img.translate(-0.5, 0.5)
-  img.scale(0.5, 0.5)
-  img.scale(1, -1)
-  draw_field(model, param, time, rows, cols)
-  img.restore()
-
-  img.save()
-  img.translate(0.5, 0.5)
-  img.scale(0.5, 0.5)
-  img.scale(-1, -1)
-  draw_field(model, param, time, rows, cols)
-  img.restore()
+  row, col = np.mgrid[0:rows, 0:cols]
+  ndc_y = np.ravel(2*(row/rows)-1+max_radius)
+  ndc_x = np.ravel(2*(col/cols)-1+max_radius)
+  # Evaluate the whole grid as one batch instead of one row per cell.
+  source = np.zeros((rows*cols, nn.DIM))
+  source[:, 0] = ndc_x
+  source[:, 1] = ndc_y
+  target = nn.apply(model, param, source+clock(time))
+  for index in range(0, rows*cols):
+    ndc_dist = min(1, math.sqrt(ndc_x[index]**2+ndc_y[index]**2))
+    latent = target[index:index+1]
+    set_color_latent(latent)
+    radius = min([
+      max_radius*radius_latent(latent),
+#      max_radius,
+    ])
+    img.save()
+    img.rotate(tau*((ndc_dist)**time))
+    img.new_path()
+    img.arc(ndc_x[index], ndc_y[index], radius, 0, tau)
+    img.fill()
+    img.restore()
+
+def record_field(model, param, time, rows, cols):
+  # draw_field draws with the global context, so point that at a
+  # recording surface while the field is drawn.
+  global img
+  display_img = img
+  field, img = symmetry.recording()
+  try:
+    draw_field(model, param, time, rows, cols)
+  finally:
+    img = display_img
+  return field
+
+def draw_field_2x2(model, param, time, rows, cols, field=None):
+  # Draw the field once and mirror the recording into each quadrant.
+  if field is None:
+    field = record_field(model, param, time, rows, cols)
+  symmetry.replicate(img, field, symmetry.quadrants())
       
 rows = 8
 cols = 8
 model = nn.dense
 param = nn.init(model)
 # media = cairo.ImageSurface.create_from_png('bin/daily_2022-07-01.png')
+output = sink.RawSink()
 for frame in range(0, RATE*LEN):
   time = frame/RATE
   set_color_black()
@@ -171,5 +166,5 @@ for frame in range(0, RATE*LEN):
   # img.restore()
 
   img.restore()
-  pixels = display.get_data()
-  sys.stdout.buffer.write(pixels)
+  output.write(display)
+output.close()
@@ -19,8 +19,8 @@ def zero_vec(dim):
   return np.zeros((1, dim))
 
 _freq = [1, 1, 1/2, 1/2, 1/3, 1/3, 1/6, 1/6]
-def rand_pendulum_param():
-  rng = np.random.default_rng()
+def rand_pendulum_param(rng=None):
+  rng = rng or np.random.default_rng()
   return rng.choice(_freq, (4, 4))
 
 def time_vec(time, dim=2):
@@ -51,78 +51,67 @@ def vec_ds(vec):
   return vec[0, 3:]
 
 def pendulum(time, param):
+  # One row of the result per time; a scalar time gives a (1, 2) vec.
   height, _ = param.shape
-  state = zero_vec(2)
-  for row in param:
-    xfreq, xphase, yfreq, yphase = row
-    xpos = cos(time*xfreq*tau+xphase)
-    ypos = sin(time*yfreq*tau+yphase)
-    residual = vec([xpos, ypos])
-    state = state + (1/height)*residual
-  return state
-
-def main():
-  pendulum_param = rand_pendulum_param()
+  time = np.atleast_1d(time)[:, None]
+  xfreq, xphase, yfreq, yphase = param.T
+  xpos = np.sum(cos(time*xfreq*tau+xphase), axis=1)
+  ypos = np.sum(sin(time*yfreq*tau+yphase), axis=1)
+  return (1/height)*np.stack([xpos, ypos], axis=1)
+
+def app(rng):
+  pendulum_param = rand_pendulum_param(rng)
   picture_model = nn.dense
-  picture_param = nn.init(picture_model)
+  picture_param = nn.init(picture_model, rng=rng)
   hflip = vec([-1, +1])
   vflip = vec([+1, -1])
-  while True:
+  def draw(frame_time):
     img.use_brush(img.brush_lavender_blush)
     img.clear()
-    time = img.time()/4
+    time = frame_time/4
 
     img.use_brush(img.brush_pastel_pink)
     window = 1.0
     radius = 2/96
-    iterations = 256
-    for i in range(0, iterations):
-      init = -window/2
-      step = window/iterations
-      residual = init+i*step
-      point = pendulum(time+residual, pendulum_param)
-      img.save()
-      img.draw_dot(vec_a(point), vec_b(point), radius)
-      point = point*hflip
-      img.draw_dot(vec_a(point), vec_b(point), radius)
-      point = point*vflip
-      img.draw_dot(vec_a(point), vec_b(point), radius)
-      point = point*hflip
-      img.draw_dot(vec_a(point), vec_b(point), radius)
-      img.restore()
+    iterations = img.scaled(256)
+    init = -window/2
+    step = window/iterations
+    residual = init+np.arange(0, iterations)*step
+    trail = pendulum(time+residual, pendulum_param)
+    # Every sample and its three mirror images, in drawing order.
+    mirror = np.stack([trail, trail*hflip, trail*hflip*vflip, trail*vflip], 1)
+    img.draw_dots(mirror[:, :, 0], mirror[:, :, 1], radius)
 
     img.use_brush(img.brush_lavender_blush)
-    picture_rows = 16
-    picture_cols = 16
+    picture_rows = img.scaled(16)
+    picture_cols = img.scaled(16)
     max_radius = 2/picture_rows/2
-    time = img.time()/2
-    for row in range(0, picture_rows):
-      dy = row/picture_rows
-      for col in range(0, picture_cols):
-        dx = col/picture_cols
-        ndc_y = 2*dy-1+max_radius
-        ndc_x = 2*dx-1+max_radius
-        ndc_dist = math.sqrt(ndc_x**2+ndc_y**2)
-        ndc_theta = math.atan2(-ndc_y, ndc_x)
-        source = vec([ndc_x, ndc_y, 0])
-        target = nn.apply(
-          picture_model,
-          picture_param,
-          source+time_vec(time,dim=3),
-        )
-        radius = max_radius*exp(-abs(vec_c(target)))
-        res_theta = tau*time**ndc_dist
-        img.draw_dot(
-          ndc_dist*cos(ndc_theta+res_theta),
-          ndc_dist*sin(ndc_theta+res_theta),
-          radius,
-        )
-    yield
-
-img.render(
-  app=main(),
-  width=DSPW,
-  height=DSPH,
-  framerate=RATE,
-  length=LEN,
-)
+    time = frame_time/2
+    row, col = np.mgrid[0:picture_rows, 0:picture_cols]
+    ndc_y = np.ravel(2*(row/picture_rows)-1+max_radius)
+    ndc_x = np.ravel(2*(col/picture_cols)-1+max_radius)
+    ndc_dist = np.sqrt(ndc_x**2+ndc_y**2)
+    ndc_theta = np.arctan2(-ndc_y, ndc_x)
+    source = np.stack([ndc_x, ndc_y, np.zeros_like(ndc_x)], axis=1)
+    target = nn.apply(
+      picture_model,
+      picture_param,
+      source+time_vec(time,dim=3),
+    )
+    radius = max_radius*exp(-abs(target[:, 2]))
+    res_theta = tau*time**ndc_dist
+    img.draw_dots(
+      ndc_dist*cos(ndc_theta+res_theta),
+      ndc_dist*sin(ndc_theta+res_theta),
+      radius,
+    )
+  return draw
+
+if __name__ == '__main__':
+  img.render(
+    app=app,
+    width=DSPW,
+    height=DSPH,
+    framerate=RATE,
+    length=LEN,
+  )
@@ -1,8 +1,17 @@
+import os
 import sys
 import math
 import cairo
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 import numpy as np
-import opensimplex as simplex
+import sink_2026_10_18 as sink
+import trace_2026_10_18 as trace
+from cache_2026_10_18 import digest, source_digest
+from clock_2026_10_18 import FrameLoop, loop_frames, loop_period
+import splat_2026_10_18 as splat
+from noise_2026_10_18 import NoiseVolume
+from spatial_2026_10_18 import SpatialHash
 
 tau = 2*math.pi
 
@@ -11,17 +20,54 @@ PALETTE = [{"name":"Pastel Pink","hex":"e89e9f","rgb":[232,158,159],"cmyk":[0,32
 _surface   = None
 _context   = None
 _brush     = None
-_sprite    = []
+_sprite    = SpatialHash()
+_packing   = False
 _frame     = 0
 _framerate = 0
+_seed      = None
+_rng       = None
+_draw      = None
+_backend   = 'cairo'
+_detail    = 1
+_width     = 0
+_height    = 0
 
 def time():
   return _frame/_framerate
 
+def rng():
+  """
+  The random generator of the frame being drawn. It's seeded with the
+  render seed and the frame number, so a frame draws the same no
+  matter which worker draws it.
+  """
+  return _rng
+
+def detail():
+  """
+  The fraction of full detail being drawn: 1, or the level of a
+  preview pass of render().
+  """
+  return _detail
+
+def context():
+  """
+  The cairo context of the frame, or tile, being drawn, for apps that
+  draw with cairo themselves. Tiles get a new one, so fetch it in
+  draw(time) rather than when the app is set up.
+  """
+  return _context
+
+def scaled(count, least=1):
+  """
+  Scale a grid size or sample count by the current detail.
+  """
+  return max(least, round(count*_detail))
+
 def clear():
-  global _sprite
-  _sprite = []
-  _brush.clear()
+  _sprite.clear()
+  with trace.span('raster'):
+    _brush.clear()
 
 def save():
   _context.save()
@@ -42,19 +88,63 @@ def use_brush(brush):
   global _brush
   _brush = brush
 
+def use_backend(backend):
+  """
+  Pick how draw_dots rasterizes: 'cairo' fills one arc per dot, and
+  'splat' draws the whole batch with NumPy, which is much faster for
+  thousands of small dots but ignores the clip.
+  """
+  global _backend
+  assert backend in ['cairo', 'splat']
+  _backend = backend
+
+def use_packing(packing, cell=2/64):
+  """
+  With packing on, a dot that would touch one already drawn since the
+  last clear() is skipped. Dots are found in a grid of the given cell
+  size, which works best about as large as a typical dot.
+  """
+  global _packing
+  global _sprite
+  _packing = packing
+  _sprite = SpatialHash(cell)
+
+def _place(lx, ly, lsize):
+  if not _packing:
+    return True
+  if _sprite.collides(lx, ly, lsize):
+    return False
+  _sprite.insert(lx, ly, lsize)
+  return True
+
 def draw_dot(lx, ly, lsize):
+  if _place(lx, ly, lsize):
+    with trace.span('raster'):
+      _brush.draw_dot(lx, ly, lsize)
+
+def draw_dots(xs, ys, sizes):
   """
-  for sprite in _sprite:
-    rx, ry, rsize = sprite
-    dx = lx-rx
-    dy = ly-ry
-    collide_dist = lsize+rsize
-    actual_dist = math.sqrt(dx**2+dy**2)
-    if actual_dist <= collide_dist:
-      return
-  _sprite.append((lx, ly, lsize))
+  Draw a batch of dots in order, like calling draw_dot on each.
   """
-  _brush.draw_dot(lx, ly, lsize)
+  xs = np.ravel(xs)
+  ys = np.ravel(ys)
+  sizes = np.broadcast_to(sizes, xs.shape)
+  if _packing:
+    keep = np.array([
+      _place(x, y, size) for x, y, size in zip(xs, ys, sizes)
+    ], dtype=bool)
+    xs, ys, sizes = xs[keep], ys[keep], sizes[keep]
+  with trace.span('raster'):
+    _brush.draw_dots(xs, ys, sizes)
+
+def _splat(xs, ys, radii, colors):
+  splat.splat(
+    _surface,
+    _context.get_matrix(),
+    np.stack([xs, ys], axis=1),
+    radii,
+    colors,
+  )
 
 def set_color_white():
   _context.set_source_rgb(1, 1, 1)
@@ -86,31 +176,342 @@ def render(
   height=256,
   framerate=15,
   length=6,
+  output=None,
+  seed=None,
+  workers=None,
+  profile=None,
+  cache=None,
+  frequencies=None,
+  preview=None,
+  preview_output=None,
+  tiles=None,
+):
+  """
+  Draw every frame of an app and hand it to an output sink, raw frames
+  on standard output by default. The sink is closed when done.
+
+  An app is either a generator that draws the next frame on every
+  next(), or a function app(rng) that sets up with a seeded generator
+  and returns draw(time). The second kind keeps no state between
+  frames, so its frames are drawn by a pool of worker processes, each
+  set up with the same seed, and written to the sink in order.
+
+  With profile set to a path, every frame's phases are timed and saved
+  there as a Chrome trace, and a summary goes to standard error.
+
+  Frames of the second kind can also be kept in a FrameCache from
+  cache_2026_10_18, keyed on the source of the loaded modules, the
+  app, the seed, the size and the frame. Only frames whose key changed
+  are drawn again, and a render that was cut short resumes from where
+  it got to. Without a seed, such a render uses the one the cache
+  keeps, so its frames are found again.
+
+  An app whose clock only runs at the given frequencies, in cycles per
+  second, repeats after their least common period. Only that period is
+  drawn, and the rest of the render cycles through its frames.
+
+  With preview set to levels between 0 and 1, like [0.25, 0.5], an app
+  of the second kind is first rendered once per level at that fraction
+  of the size and frame rate, while detail() returns the level, so it
+  can draw coarser grids and fewer samples. Every pass goes to its own sink from
+  preview_output(level), PNGs in bin/preview/ by default, and the full
+  render comes last.
+
+  With tiles set to (cols, rows), every frame of the second kind is
+  split into that grid of tiles, each drawn by a worker on its own
+  small surface, offset so it shows its part of the frame, and the
+  tiles are stitched back together. One very large frame then uses
+  every core, and no worker holds the whole frame.
+  """
+  if profile is not None:
+    with trace.profile(profile):
+      return render(
+        app, width, height, framerate, length, output, seed, workers,
+        cache=cache,
+        frequencies=frequencies,
+        preview=preview,
+        preview_output=preview_output,
+        tiles=tiles,
+      )
+
+  if hasattr(app, '__next__'):
+    # Preview passes would use up the generator, and the full render
+    # would start from where they left it.
+    assert not preview, 'render: only app(rng) apps draw previews'
+
+  # Every pass draws from the same seed, so they show the same picture.
+  if seed is None and cache is not None:
+    seed = cache.seed()
+  elif seed is None:
+    seed = np.random.SeedSequence().entropy
+  preview_output = preview_output or _preview_output
+  for level in preview or []:
+    _render(
+      app,
+      max(1, round(width*level)),
+      max(1, round(height*level)),
+      max(1, round(framerate*level)),
+      length,
+      preview_output(level),
+      seed,
+      workers,
+      cache,
+      frequencies,
+      level,
+      tiles,
+    )
+  _render(
+    app, width, height, framerate, length, output, seed, workers,
+    cache, frequencies, 1, tiles,
+  )
+
+def _preview_output(level):
+  # Kept apart from the committed pictures in bin/, and ignored by git.
+  os.makedirs('bin/preview', exist_ok=True)
+  return sink.PngSink(f'bin/preview/{level:g}-{{:03d}}.png')
+
+def _render(
+  app,
+  width,
+  height,
+  framerate,
+  length,
+  output,
+  seed,
+  workers,
+  cache,
+  frequencies,
+  detail,
+  tiles,
+):
+  global _frame
+
+  output = output or sink.RawSink()
+  frame_count = math.ceil(framerate*length)
+  loop = None
+  if frequencies is not None:
+    count = loop_frames(loop_period(frequencies), framerate)
+    if count < frame_count:
+      loop = FrameLoop(count)
+  if hasattr(app, '__next__'):
+    # A generator's state moves on with every draw, so its frames can't
+    # be split between workers.
+    assert tiles is None, 'render: only app(rng) apps draw in tiles'
+    _start(width, height, framerate, detail=detail)
+    with output:
+      while _frame < frame_count:
+        if loop is not None and loop.full():
+          loop.replay(output, _frame, frame_count)
+          break
+        trace.set_frame(_frame)
+        _context.save()
+        _context.translate(width/2, height/2)
+        _context.scale(width/2, height/2)
+        with trace.span('app'):
+          next(app)
+        _context.restore()
+        with trace.span('write'):
+          output.write(_surface)
+          if loop is not None:
+            loop.keep(
+              bytes(_surface.get_data()),
+              width,
+              height,
+              _surface.get_stride(),
+            )
+        _frame += 1
+    return
+
+  workers = workers or os.cpu_count()
+  initargs = (width, height, framerate, app, seed, detail, tiles is not None)
+  split = None
+  if tiles is not None:
+    split = _split(width, height, *tiles)
+  keys = [None]*frame_count
+  if cache is not None:
+    source = source_digest()
+    name = f'{app.__module__}.{app.__qualname__}'
+    keys = [
+      digest(source, name, seed, width, height, framerate, detail, frame)
+      for frame in range(0, frame_count)
+    ]
+  drawn = loop.count if loop is not None else frame_count
+  with output:
+    if workers == 1:
+      _start(*initargs)
+      for frame in range(0, drawn):
+        result = _lookup(cache, keys[frame])
+        if result is None and split is None:
+          result = _store(cache, keys[frame], _draw_frame(frame))
+        elif result is None:
+          parts = [_draw_frame(frame, tile) for tile in split]
+          result = _store(cache, keys[frame], _stitch(parts, split))
+        _write(output, frame, result, loop)
+    else:
+      _draw_pool(output, workers, initargs, drawn, cache, keys, loop, split)
+    if loop is not None:
+      loop.replay(output, drawn, frame_count)
+
+def _draw_pool(
+  output,
+  workers,
+  initargs,
+  drawn,
+  cache,
+  keys,
+  loop,
+  split,
+):
+  with ProcessPoolExecutor(
+    max_workers=workers,
+    initializer=_start_worker,
+    initargs=(trace.tracing(), *initargs),
+  ) as pool:
+    # Keep a couple of frames per worker in flight, so the pool stays
+    # busy without buffering the whole render ahead of the sink.
+    pending = deque()
+    for frame in range(0, drawn):
+      result = _lookup(cache, keys[frame])
+      if result is None and split is None:
+        result = pool.submit(_draw_frame, frame)
+      elif result is None:
+        result = [pool.submit(_draw_frame, frame, tile) for tile in split]
+      pending.append((frame, result))
+      # Tiles count as frames' worth of work here, so a tiled frame
+      # keeps the pool busy on its own.
+      if sum(_size(result) for _, result in pending) >= 2*workers:
+        _finish(output, cache, keys, loop, split, *pending.popleft())
+    while pending:
+      _finish(output, cache, keys, loop, split, *pending.popleft())
+
+def _size(result):
+  return len(result) if isinstance(result, list) else 1
+
+def _split(width, height, cols, rows):
+  """
+  Cut a frame into a grid of (left, top, width, height) tiles.
+  """
+  xs = [width*col//cols for col in range(0, cols+1)]
+  ys = [height*row//rows for row in range(0, rows+1)]
+  return [
+    (xs[col], ys[row], xs[col+1]-xs[col], ys[row+1]-ys[row])
+    for row in range(0, rows)
+    for col in range(0, cols)
+  ]
+
+def _stitch(results, split):
+  # The last tile is the bottom right corner of the frame.
+  left, top, tile_width, tile_height = split[-1]
+  width, height = left+tile_width, top+tile_height
+  frame = np.zeros((height, width*4), dtype=np.uint8)
+  events = []
+  for result, (left, top, _, _) in zip(results, split):
+    data, tile_width, tile_height, stride, tile_events = result
+    tile = np.frombuffer(data, dtype=np.uint8).reshape(tile_height, stride)
+    frame[top:top+tile_height, 4*left:4*(left+tile_width)] = (
+      tile[:, :4*tile_width])
+    events += tile_events
+  return frame.tobytes(), width, height, width*4, events
+
+def _lookup(cache, key):
+  if cache is None:
+    return None
+  with trace.span('cache'):
+    result = cache.get(key)
+  if result is None:
+    return None
+  return (*result, [])
+
+def _store(cache, key, result):
+  if cache is not None:
+    data, width, height, stride, _ = result
+    with trace.span('cache'):
+      cache.put(key, data, width, height, stride)
+  return result
+
+def _finish(output, cache, keys, loop, split, frame, result):
+  if isinstance(result, Future):
+    result = _store(cache, keys[frame], result.result())
+  elif isinstance(result, list):
+    parts = [tile.result() for tile in result]
+    result = _store(cache, keys[frame], _stitch(parts, split))
+  _write(output, frame, result, loop)
+
+def _write(output, frame, result, loop=None):
+  data, width, height, stride, events = result
+  trace.absorb(events)
+  trace.set_frame(frame)
+  with trace.span('write'):
+    output.write_data(data, width, height, stride)
+    if loop is not None:
+      loop.keep(data, width, height, stride)
+
+def _start_worker(tracing, *initargs):
+  # A forked worker may inherit the render's tracer; trace into a fresh
+  # one and send its events back with every frame.
+  trace.use_tracer(trace.Tracer() if tracing else None)
+  _start(*initargs)
+
+def _start(
+  width,
+  height,
+  framerate,
+  app=None,
+  seed=None,
+  detail=1,
+  tiled=False,
 ):
   global _surface
   global _context
   global _brush
   global _frame
   global _framerate
+  global _seed
+  global _draw
+  global _detail
+  global _width
+  global _height
 
+  # Tiles get their own surfaces as they're drawn.
   _surface = cairo.ImageSurface(
     cairo.FORMAT_ARGB32,
-    width,
-    height,
+    1 if tiled else width,
+    1 if tiled else height,
   )
   _context = cairo.Context(_surface)
+  _width = width
+  _height = height
   _brush = brush_bw
   _frame = 0
   _framerate = framerate
-  while _frame < _framerate*length:
-    _context.save()
-    _context.translate(width/2, height/2)
-    _context.scale(width/2, height/2)
-    next(app)
-    _context.restore()
-    pixels = _surface.get_data()
-    sys.stdout.buffer.write(pixels)
-    _frame += 1
+  _seed = seed
+  _detail = detail
+  if app is not None:
+    _draw = app(np.random.default_rng(seed))
+
+def _draw_frame(frame, tile=None):
+  global _frame
+  global _rng
+  global _surface
+  global _context
+
+  _frame = frame
+  _rng = np.random.default_rng([_seed, frame])
+  trace.set_frame(frame)
+  left, top, width, height = tile or (0, 0, _width, _height)
+  if tile is not None:
+    _surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    _context = cairo.Context(_surface)
+  _context.save()
+  _context.translate(_width/2-left, _height/2-top)
+  _context.scale(_width/2, _height/2)
+  with trace.span('app'):
+    _draw(time())
+  _context.restore()
+  with trace.span('write'):
+    _surface.flush()
+    data = bytes(_surface.get_data())
+  return data, width, height, _surface.get_stride(), trace.take()
 
 class BasicBrush:
   def __init__(
@@ -137,9 +538,25 @@ class BasicBrush:
     _context.arc(x, y, radius, 0, tau)
     _context.fill()
 
+  def draw_dots(self, xs, ys, radii):
+    if _backend != 'splat':
+      for x, y, radius in zip(xs, ys, radii):
+        self.draw_dot(x, y, radius)
+      return
+    self.fg_func()
+    color = _context.get_source().get_rgba()
+    _splat(xs, ys, radii, color)
+
 class ExpertBrush:
   def __init__(self):
-    pass
+    self._noise = None
+
+  def noise(self, xs, ys):
+    # The noise loops every 6 seconds, so it's sampled from a volume
+    # built on first use rather than evaluated once per dot.
+    if self._noise is None:
+      self._noise = NoiseVolume(period=6, speed=tau/6, lhs=0, rhs=1)
+    return self._noise.sample(time(), xs**2, ys**2)
 
   def clear(self):
     set_color_outer_space_crayola()
@@ -153,11 +570,7 @@ class ExpertBrush:
 
   def draw_dot(self, x, y, radius):
     _context.new_path()
-    noise = simplex.noise3(
-      tau*(time()/6),
-      x**2,
-      y**2,
-    )
+    noise = self.noise(x, y)
     if noise < 0.5:
       set_color_pastel_pink()
     else:
@@ -165,6 +578,23 @@ class ExpertBrush:
     _context.arc(x, y, radius, 0, tau)
     _context.fill()
 
+  def draw_dots(self, xs, ys, radii):
+    noise = self.noise(xs, ys)
+    if _backend != 'splat':
+      for x, y, radius, value in zip(xs, ys, radii, noise):
+        _context.new_path()
+        if value < 0.5:
+          set_color_pastel_pink()
+        else:
+          set_color_lavender_blush()
+        _context.arc(x, y, radius, 0, tau)
+        _context.fill()
+      return
+    pink = np.append(np.array(PALETTE[0]['rgb'])/255, 1)
+    blush = np.append(np.array(PALETTE[1]['rgb'])/255, 1)
+    colors = np.where((noise < 0.5)[:, None], pink, blush)
+    _splat(xs, ys, radii, colors)
+
 class ImageBrush:
   def __init__(self):
     pass
@@ -175,6 +605,9 @@ class ImageBrush:
   def draw_dot(self, x, y, radius):
     pass
 
+  def draw_dots(self, xs, ys, radii):
+    pass
+
 class VideoBrush:
   def __init__(self):
     pass
@@ -185,6 +618,9 @@ class VideoBrush:
   def draw_dot(self, x, y, radius):
     pass
 
+  def draw_dots(self, xs, ys, radii):
+    pass
+
 brush_bw = BasicBrush(
   set_color_white, set_color_black)
 brush_super_pink = BasicBrush(
@@ -0,0 +1,21 @@
+import pytest
+pytest.importorskip('cairo')
+import img_2022_07_09 as img
+import sink_2026_10_18 as sink
+
+# Run with python -m pytest img_2022_07_09_test.py.
+
+def frames():
+  while True:
+    yield
+
+def test_generator_apps_draw_no_previews():
+  def preview_output(level):
+    raise AssertionError('a preview pass started')
+  with pytest.raises(AssertionError, match='previews'):
+    img.render(
+      frames(), 16, 16, 2, 1,
+      output=sink.NullSink(),
+      preview=[0.5],
+      preview_output=preview_output,
+    )
@@ -0,0 +1,99 @@
+import queue
+import threading
+import cairo
+from collections import OrderedDict
+
+class MediaSequence:
+  """
+  A numbered sequence of PNG frames that decodes on demand. Decoded
+  surfaces live in a small LRU cache, and every lookup asks a
+  background thread to decode the next few frames, so a render that
+  walks the sequence in order rarely waits and memory stays constant
+  however long the clip is.
+
+  The pattern is formatted with the frame number, counting from start,
+  like 'bin/daily_2022_07_08_frame-{:03d}.png'.
+  """
+  pattern: str
+  count: int
+  start: int
+  capacity: int
+  ahead: int
+
+  def __init__(
+    self,
+    pattern: str,
+    count: int,
+    start: int = 1,
+    capacity: int = 8,
+    ahead: int = 4,
+  ):
+    assert capacity > ahead
+    self.pattern = pattern
+    self.count = count
+    self.start = start
+    self.capacity = capacity
+    self.ahead = ahead
+    self._cache = OrderedDict()
+    self._pending = set()
+    self._lock = threading.Condition()
+    self._queue = queue.Queue()
+    self._thread = threading.Thread(target=self._run, daemon=True)
+    self._thread.start()
+
+  def __len__(self) -> int:
+    return self.count
+
+  def __getitem__(self, index: int) -> cairo.ImageSurface:
+    if index < 0 or index >= self.count:
+      raise IndexError(f'media: no frame {index}')
+    for step in range(1, self.ahead+1):
+      if index+step < self.count:
+        self._request(index+step)
+    with self._lock:
+      while index in self._pending:
+        self._lock.wait()
+      if index in self._cache:
+        self._cache.move_to_end(index)
+        return self._cache[index]
+      self._pending.add(index)
+    return self._load(index)
+
+  def close(self):
+    self._queue.put(None)
+    self._thread.join()
+
+  def _request(self, index: int):
+    with self._lock:
+      if index in self._cache or index in self._pending:
+        return
+      self._pending.add(index)
+    self._queue.put(index)
+
+  def _load(self, index: int) -> cairo.ImageSurface:
+    # The caller has marked the index pending; always clear it, so a
+    # failed decode doesn't leave readers waiting.
+    surface = None
+    try:
+      path = self.pattern.format(index+self.start)
+      surface = cairo.ImageSurface.create_from_png(path)
+      return surface
+    finally:
+      with self._lock:
+        self._pending.discard(index)
+        if surface is not None:
+          self._cache[index] = surface
+          while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+        self._lock.notify_all()
+
+  def _run(self):
+    while True:
+      index = self._queue.get()
+      if index is None:
+        return
+      try:
+        self._load(index)
+      except Exception:
+        # The reader will decode it again and see the error itself.
+        pass
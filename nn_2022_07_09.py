@@ -5,28 +5,56 @@ import numpy as np
 from abc import ABC as Abstract
 from abc import abstractmethod
 from typing import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MethodType
+from weakref import WeakKeyDictionary
+from trace_2026_10_18 import span
 from loguru import logger as log
 
 _nil = np.array([[0]])
 Tensor = np.ndarray
 DIM = 2 + 1 + 2
+# Parameters are drawn with this dtype unless init is given another,
+# and apply evaluates in whatever dtype its parameters have.
+DTYPE = np.float32
+
+# How many parameters a plan keeps bound at once, e.g. a model's own
+# parameters alongside a population searching around them.
+BIND_LIMIT = 4
+# apply evaluates with the width of its source instead of DIM. This is
+# per context, so threads and tasks can run models of different widths.
+_width = ContextVar('_width', default=DIM)
 Exp = Callable[[Tensor], Tensor]
 
 def relu(x: Tensor) -> Tensor:
   return np.maximum(x, 0)
 
 def normalize(x: Tensor) -> Tensor:
-  mean = np.mean(x)
-  var = np.cov(x,bias=True)
+  # Each row of a batch is normalized on its own, so a (1, DIM) row
+  # gives the same result alone or stacked with its neighbours.
+  mean = np.mean(x, axis=-1, keepdims=True)
+  var = np.var(x, axis=-1, keepdims=True)
   stddev = np.sqrt(var)
   return (x-mean)/(stddev+1e-5)
 
 # This API is like React Hooks. A handler performs effects within a
 # dynamic scope, so you don't need to thread state through explicitly.
-_dynamic_scope = None
+# The scope is a context variable, so every thread and asyncio task
+# gets its own.
+_dynamic_scope = ContextVar('_dynamic_scope', default=None)
 
 def use_param(grade: int = 1) -> Tensor:
-  return _dynamic_scope.use_param(grade)
+  return _dynamic_scope.get().use_param(grade)
+
+@contextmanager
+def _handle(scope):
+  assert _dynamic_scope.get() == None
+  token = _dynamic_scope.set(scope)
+  try:
+    yield scope
+  finally:
+    _dynamic_scope.reset(token)
 
 class Scope(Abstract):
   @abstractmethod
@@ -40,48 +68,138 @@ class Init(Scope):
   param_count: int = 0
 
   def __init__(self):
-    pass
+    self.grades = []
 
   def use_param(self, grade: int) -> Tensor:
-    count = DIM**grade
+    count = _width.get()**grade
     self.param_count += count
+    self.grades.append(grade)
     return _nil
 
 class Apply(Scope):
   param: Tensor
+  population: bool
   _param_index: int = 0
 
-  def __init__(self, param: Tensor):
+  def __init__(self, param: Tensor, population: bool = False):
     self.param = param
+    self.population = population
+    self.dim = _width.get()
     self._shape_from_grade = [
-      (1, 1), (1, DIM), (DIM, DIM),
+      (1, 1), (1, self.dim), (self.dim, self.dim),
     ]
 
   def use_param(self, grade: int) -> Tensor:
-    param_count = DIM**grade
+    param_count = self.dim**grade
     param_shape = self._shape_from_grade[grade]
     lhs = self._param_index
     rhs = self._param_index + param_count
     _, total_param_count = self.param.shape
     if rhs > total_param_count:
       raise Exception('apply: no more parameters')
-    value = self.param[0, lhs:rhs]
-    value = np.reshape(value, param_shape)
+    if self.population:
+      # One stacked view per row, so the row is a batch axis.
+      count, _ = self.param.shape
+      value = self.param[:, lhs:rhs]
+      value = np.reshape(value, (count, *param_shape))
+    else:
+      value = self.param[0, lhs:rhs]
+      value = np.reshape(value, param_shape)
     self._param_index += param_count
     return value
 
-def init(exp: Exp) -> Tensor:
+class Replay(Scope):
+  views: list
+  _index: int = 0
+
+  def __init__(self, views: list):
+    self.views = views
+
+  def use_param(self, grade: int) -> Tensor:
+    value = self.views[self._index]
+    self._index += 1
+    return value
+
+class Plan:
   """
-  Trace an expression for its initial parameter vector.
+  The ordered parameter grades of an expression, recorded once by a
+  trace. Binding a plan slices and reshapes every parameter view up
+  front, so later evaluations only hand them out in order.
   """
-  global _dynamic_scope
-  assert _dynamic_scope == None
-  _dynamic_scope = Init()
-  exp(_nil)
-  shape = (1, _dynamic_scope.param_count)
-  rng = np.random.default_rng()
-  param = rng.standard_normal(shape)
-  _dynamic_scope = None
+  grades: list
+  param_count: int
+  _bound: dict
+
+  def __init__(self, grades: list, param_count: int):
+    self.grades = grades
+    self.param_count = param_count
+    self._bound = {}
+
+  def bind(self, param: Tensor, population: bool = False) -> list:
+    # The last few parameters bound, by id. An entry keeps its
+    # parameter alive, so the id can't be reused while it's cached.
+    # Binding swaps in a new dict, so a concurrent bind never sees one
+    # half updated.
+    key = (id(param), population)
+    entry = self._bound.get(key)
+    if entry is None:
+      scope = Apply(param=param, population=population)
+      entry = (param, [scope.use_param(grade) for grade in self.grades])
+      bound = dict(self._bound)
+      bound[key] = entry
+      while len(bound) > BIND_LIMIT:
+        del bound[next(iter(bound))]
+      self._bound = bound
+    return entry[1]
+
+# Plans live as long as their expression, then per width. A closure
+# built on every call, like lambda v: dense(v, depth=3), is a new key
+# each time and traces again, so hoist it out of the loop.
+_plan_cache = WeakKeyDictionary()
+# A bound method is made anew on every attribute access, so its plans
+# are filed under its instance, then its function.
+_method_plans = WeakKeyDictionary()
+
+def _plans_of(exp) -> dict:
+  try:
+    if isinstance(exp, MethodType):
+      methods = _method_plans.setdefault(exp.__self__, {})
+      return methods.setdefault(exp.__func__, {})
+    return _plan_cache.setdefault(exp, {})
+  except TypeError:
+    # It can't be weakly referenced, e.g. __slots__ without
+    # __weakref__, so it isn't cached and traces on every call.
+    return {}
+
+def trace(exp: Exp) -> Plan:
+  """
+  Return the parameter plan of an expression, tracing it on first use.
+  """
+  plans = _plans_of(exp)
+  width = _width.get()
+  if width not in plans:
+    with _handle(Init()) as scope:
+      exp(_nil)
+    plans[width] = Plan(
+      grades=scope.grades,
+      param_count=scope.param_count,
+    )
+  return plans[width]
+
+def init(
+  exp: Exp,
+  dtype=None,
+  count: int = 1,
+  rng: np.random.Generator = None,
+) -> Tensor:
+  """
+  Trace an expression for its initial parameter vector, or for a
+  (count, param_count) population of them.
+  """
+  plan = trace(exp)
+  shape = (count, plan.param_count)
+  rng = rng or np.random.default_rng()
+  param = rng.standard_normal(shape, dtype=dtype or DTYPE)
   return param
 
 def apply(
@@ -90,17 +208,41 @@ def apply(
   source: Tensor,
 ) -> Tensor:
   """
-  Apply an expression to a value with a parameter vector.
+  Apply an expression to a value with a parameter vector. The source
+  may be a (N, DIM) batch; every row is evaluated independently.
   """
+  return _apply(exp, param, source, population=False)
+
+def apply_population(
+  exp: Exp,
+  population: Tensor,
+  source: Tensor,
+) -> Tensor:
+  """
+  Apply an expression to the same (N, DIM) value with every row of a
+  (count, param_count) population at once, giving (count, N, DIM).
+  """
+  return _apply(exp, population, source, population=True)
+
+def _apply(
+  exp: Exp,
+  param: Tensor,
+  source: Tensor,
+  population: bool,
+) -> Tensor:
   # Assumes everything is uni-shaped.
-  global DIM
   _, width = source.shape
-  DIM = width
-  global _dynamic_scope
-  assert _dynamic_scope == None
-  _dynamic_scope = Apply(param=param)
-  target = exp(source)
-  _dynamic_scope = None
+  token = _width.set(width)
+  try:
+    source = np.asarray(source, dtype=param.dtype)
+    if population:
+      count, _ = param.shape
+      source = np.broadcast_to(source, (count, *source.shape))
+    views = trace(exp).bind(param, population)
+    with span('model'), _handle(Replay(views=views)):
+      target = exp(source)
+  finally:
+    _width.reset(token)
   return target
 
 def dense(value: Tensor, depth: int = 2):
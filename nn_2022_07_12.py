@@ -1,12 +1,40 @@
+import math
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from scipy.special import softmax
 from functools import reduce
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MethodType
+from weakref import WeakKeyDictionary
+from trace_2026_10_18 import span
 from loguru import logger as log
 
-_dynamic_scope = None
+# Parameters are drawn with this dtype unless init is given another,
+# and eval runs in whatever dtype its parameters have.
+DTYPE = np.float32
+
+# How many parameters a plan keeps bound at once, e.g. a model's own
+# parameters alongside a population searching around them.
+BIND_LIMIT = 4
+
+# A context variable, so every thread and asyncio task evaluates in its
+# own scope.
+_dynamic_scope = ContextVar('_dynamic_scope', default=None)
+# Set by decode, so attention layers reuse keys and values from a Cache.
+_dynamic_cache = ContextVar('_dynamic_cache', default=None)
 
 def use_param(shape) -> np.ndarray:
-  return _dynamic_scope.use_param(shape)
+  return _dynamic_scope.get().use_param(shape)
+
+@contextmanager
+def _handle(scope):
+  assert _dynamic_scope.get() == None
+  token = _dynamic_scope.set(scope)
+  try:
+    yield scope
+  finally:
+    _dynamic_scope.reset(token)
 
 def _sizeof(shape):
   return reduce(lambda s, x: s*x, shape)
@@ -14,30 +42,121 @@ def _sizeof(shape):
 class _Init:
   size: int = 0
 
+  def __init__(self):
+    self.shapes = []
+
   def use_param(self, shape) -> np.ndarray:
-    param = np.zeros(shape)
+    param = np.zeros(shape, dtype=DTYPE)
     self.size += param.size
+    self.shapes.append(shape)
     return param
 
 class _Eval:
   param: np.ndarray
+  lead: int
   _index: int = 0
 
-  def __init__(self, param: np.ndarray):
+  def __init__(self, param: np.ndarray, lead: int = None):
+    # With lead set, every row of param is one member of a population
+    # and views get a population axis plus lead singleton axes, so they
+    # broadcast against a [population, *lead, seq, dim] source.
     self.param = param
+    self.lead = lead
     self._index = 0
 
   def use_param(self, shape) -> np.ndarray:
     param_size = _sizeof(shape)
     lhs = self._index
     rhs = self._index + param_size
-    total_size = self.param.size
+    count, total_size = self.param.shape
     assert rhs <= total_size
-    value = self.param[0, lhs:rhs]
-    value = np.reshape(value, shape)
+    if self.lead is None:
+      value = self.param[0, lhs:rhs]
+      value = np.reshape(value, shape)
+    else:
+      value = self.param[:, lhs:rhs]
+      value = np.reshape(value, (count, *(1,)*self.lead, *shape))
     self._index += param_size
     return value
 
+class _Replay:
+  views: list
+  _index: int = 0
+
+  def __init__(self, views: list):
+    self.views = views
+    self._index = 0
+
+  def use_param(self, shape) -> np.ndarray:
+    value = self.views[self._index]
+    self._index += 1
+    return value
+
+class _Plan:
+  """
+  The ordered parameter shapes of a model, recorded once by a trace.
+  Binding a plan slices and reshapes every parameter view up front, so
+  later evaluations only hand them out in order.
+  """
+  shapes: list
+  size: int
+  _bound: dict
+
+  def __init__(self, shapes: list, size: int):
+    self.shapes = shapes
+    self.size = size
+    self._bound = {}
+
+  def bind(self, param: np.ndarray, lead: int = None) -> list:
+    # The last few parameters bound, by id. An entry keeps its
+    # parameter alive, so the id can't be reused while it's cached.
+    # Binding swaps in a new dict, so a concurrent bind never sees one
+    # half updated.
+    key = (id(param), lead)
+    entry = self._bound.get(key)
+    if entry is None:
+      scope = _Eval(param=param, lead=lead)
+      entry = (param, [scope.use_param(shape) for shape in self.shapes])
+      bound = dict(self._bound)
+      bound[key] = entry
+      while len(bound) > BIND_LIMIT:
+        del bound[next(iter(bound))]
+      self._bound = bound
+    return entry[1]
+
+# Plans live as long as their model, then per width of the source,
+# since that's all the parameter shapes of these models depend on. A
+# closure built on every call, like lambda v: transformer(v, chunk=64),
+# is a new key each time and traces again, so hoist it out of the loop.
+_plans = WeakKeyDictionary()
+# A bound method is made anew on every attribute access, so its plans
+# are filed under its instance, then its function.
+_method_plans = WeakKeyDictionary()
+
+def _plans_of(model) -> dict:
+  try:
+    if isinstance(model, MethodType):
+      methods = _method_plans.setdefault(model.__self__, {})
+      return methods.setdefault(model.__func__, {})
+    return _plans.setdefault(model, {})
+  except TypeError:
+    # It can't be weakly referenced, e.g. __slots__ without
+    # __weakref__, so it isn't cached and traces on every call.
+    return {}
+
+def _trace(model, source_shape) -> _Plan:
+  plans = _plans_of(model)
+  width = source_shape[-1]
+  if width not in plans:
+    source = np.zeros(source_shape, dtype=DTYPE)
+    with _handle(_Init()) as scope:
+      _ = model(source)
+    plans[width] = _Plan(
+      shapes=scope.shapes,
+      size=scope.size,
+    )
+  return plans[width]
+
 def _norm(value: np.ndarray) -> np.ndarray:
   dim = value.shape[-1]
   gain = use_param((1, dim))
@@ -49,7 +168,7 @@ def _norm(value: np.ndarray) -> np.ndarray:
   return gain*target+bias
 
 def _solu(value: np.ndarray) -> np.ndarray:
-  return _norm(value*softmax(value))
+  return _norm(value*softmax(value, axis=-1))
 
 def _full(value: np.ndarray) -> np.ndarray:
   dim = value.shape[-1]
@@ -57,36 +176,162 @@ def _full(value: np.ndarray) -> np.ndarray:
   bias = use_param((1, dim))
   return _solu(value@spin+bias)
 
-def _attn(value: np.ndarray) -> np.ndarray:
-  dim = value.shape[-1]
+def _heads(value: np.ndarray, heads: int) -> np.ndarray:
+  *lead, seq, dim = value.shape
+  assert dim % heads == 0
+  return np.reshape(value, (*lead, seq, heads, dim//heads))
+
+def _mask(
+  energy: np.ndarray,
+  q_lhs: int,
+  k_lhs: int,
+  offset: int,
+) -> np.ndarray:
+  # Hide every key that comes after its query. The offset counts the
+  # tokens before the first query, i.e. those already in a cache.
+  if offset is None:
+    return energy
+  q_pos = offset+q_lhs+np.arange(energy.shape[-2])
+  k_pos = k_lhs+np.arange(energy.shape[-1])
+  return np.where(k_pos > q_pos[:, None], -np.inf, energy)
+
+def _attend(
+  q: np.ndarray,
+  k: np.ndarray,
+  v: np.ndarray,
+  offset: int = None,
+) -> np.ndarray:
+  energy = np.einsum('...qhd,...khd->...hqk', q, k)
+  energy = _mask(energy, 0, 0, offset)
+  scores = softmax(energy, axis=-1)
+  return np.einsum('...hqk,...khd->...qhd', scores, v)
+
+def _attend_chunked(
+  q: np.ndarray,
+  k: np.ndarray,
+  v: np.ndarray,
+  chunk: int,
+  offset: int = None,
+) -> np.ndarray:
+  # Walk blocks of queries against blocks of keys, keeping a running
+  # max and sum per query so the softmax is exact without ever holding
+  # more than a chunk x chunk block of energies.
+  q_seq = q.shape[-3]
+  k_seq = k.shape[-3]
+  target = np.empty(q.shape[:-1]+v.shape[-1:], dtype=q.dtype)
+  for q_lhs in range(0, q_seq, chunk):
+    q_blk = q[..., q_lhs:q_lhs+chunk, :, :]
+    *lead, q_len, heads, _ = q_blk.shape
+    peak = np.full((*lead, heads, q_len), -np.inf, dtype=q.dtype)
+    total = np.zeros((*lead, heads, q_len), dtype=q.dtype)
+    accum = np.zeros((*lead, q_len, heads, v.shape[-1]), dtype=q.dtype)
+    for k_lhs in range(0, k_seq, chunk):
+      if offset is not None and k_lhs > offset+q_lhs+q_len-1:
+        break
+      k_blk = k[..., k_lhs:k_lhs+chunk, :, :]
+      v_blk = v[..., k_lhs:k_lhs+chunk, :, :]
+      energy = np.einsum('...qhd,...khd->...hqk', q_blk, k_blk)
+      energy = _mask(energy, q_lhs, k_lhs, offset)
+      next_peak = np.maximum(peak, np.max(energy, axis=-1))
+      decay = np.exp(peak-next_peak)
+      weight = np.exp(energy-next_peak[..., None])
+      total = total*decay+np.sum(weight, axis=-1)
+      accum = accum*np.swapaxes(decay, -1, -2)[..., None]
+      accum = accum+np.einsum('...hqk,...khd->...qhd', weight, v_blk)
+      peak = next_peak
+    scale = np.swapaxes(total, -1, -2)[..., None]
+    target[..., q_lhs:q_lhs+chunk, :, :] = accum/scale
+  return target
+
+def _attn(
+  value: np.ndarray,
+  heads: int = 1,
+  chunk: int = None,
+  causal: bool = False,
+) -> np.ndarray:
+  *lead, seq, dim = value.shape
   Q = use_param((dim, dim))
   K = use_param((dim, dim))
   V = use_param((dim, dim))
   q, k, v = value@Q, value@K, value@V
+  q, k, v = _heads(q, heads), _heads(k, heads), _heads(v, heads)
   # could you layer norm here instead of dividing by sqrt(dim)?
-  energy = (q@k.T)/np.sqrt(dim)
-  scores = softmax(energy)
-  return scores@v
+  q = q/math.sqrt(dim//heads)
+  offset = 0 if causal else None
+  cache = _dynamic_cache.get()
+  if cache is not None:
+    k, v = cache.extend(k, v)
+    offset = k.shape[-3]-seq
+  if chunk is None or chunk >= k.shape[-3]:
+    target = _attend(q, k, v, offset)
+  else:
+    target = _attend_chunked(q, k, v, chunk, offset)
+  return np.reshape(target, (*lead, seq, dim))
 
 def transformer(
   value: np.ndarray,
   depth: int = 2,
+  heads: int = 1,
+  chunk: int = None,
+  causal: bool = False,
 ) -> np.ndarray:
+  """
+  The value is a [seq, dim] sequence or a [batch, seq, dim] stack of
+  sequences; every sequence attends only to its own tokens. With a
+  chunk size, attention streams over blocks of that many tokens so
+  memory doesn't grow with the square of the sequence length. A causal
+  transformer only attends to earlier tokens, and can be run one token
+  at a time with decode.
+  """
   for _ in range(0, depth):
-    value = _norm(value+_attn(value))
+    value = _norm(value+_attn(value, heads, chunk, causal))
     value = _norm(value+_full(value))
   return value
 
-def init(model, source_shape) -> np.ndarray:
-  global _dynamic_scope
-  assert _dynamic_scope == None
-  _dynamic_scope = _Init()
-  source = np.zeros(source_shape)
-  _ = model(source)
-  param_shape = (1, _dynamic_scope.size)
-  rng = np.random.default_rng()
-  param = rng.standard_normal(param_shape)
-  _dynamic_scope = None
+class Cache:
+  """
+  The keys and values of every attention layer for the tokens decoded
+  so far. Pass the same cache to every decode call of one sequence.
+  """
+  keys: list
+  values: list
+  _layer: int = 0
+
+  def __init__(self):
+    self.keys = []
+    self.values = []
+    self._layer = 0
+
+  def __len__(self) -> int:
+    if not self.keys:
+      return 0
+    return self.keys[0].shape[-3]
+
+  def rewind(self):
+    self._layer = 0
+
+  def extend(self, k: np.ndarray, v: np.ndarray):
+    layer = self._layer
+    if layer == len(self.keys):
+      self.keys.append(k)
+      self.values.append(v)
+    else:
+      self.keys[layer] = np.concatenate([self.keys[layer], k], axis=-3)
+      self.values[layer] = np.concatenate([self.values[layer], v], axis=-3)
+    self._layer += 1
+    return self.keys[layer], self.values[layer]
+
+def init(
+  model,
+  source_shape,
+  dtype=None,
+  count: int = 1,
+  rng: np.random.Generator = None,
+) -> np.ndarray:
+  plan = _trace(model, source_shape)
+  param_shape = (count, plan.size)
+  rng = rng or np.random.default_rng()
+  param = rng.standard_normal(param_shape, dtype=dtype or DTYPE)
   return param
 
 def eval(
@@ -94,38 +339,118 @@ def eval(
   param: np.ndarray,
   source: np.ndarray,
 ) -> np.ndarray:
-  global _dynamic_scope
-  assert _dynamic_scope == None
-  _dynamic_scope = _Eval(param=param)
-  target = model(source)
-  _dynamic_scope = None
+  source = np.asarray(source, dtype=param.dtype)
+  views = _trace(model, source.shape).bind(param)
+  with span('model'), _handle(_Replay(views=views)):
+    target = model(source)
+  return target
+
+def decode(
+  model,
+  param: np.ndarray,
+  source: np.ndarray,
+  cache: Cache,
+) -> np.ndarray:
+  """
+  Evaluate the next tokens of a sequence with a causal model. Earlier
+  tokens are read from the cache instead of being recomputed, and the
+  new tokens' keys and values are added to it.
+  """
+  source = np.asarray(source, dtype=param.dtype)
+  views = _trace(model, source.shape).bind(param)
+  cache.rewind()
+  token = _dynamic_cache.set(cache)
+  try:
+    with span('model'), _handle(_Replay(views=views)):
+      target = model(source)
+  finally:
+    _dynamic_cache.reset(token)
+  return target
+
+def eval_population(
+  model,
+  population: np.ndarray,
+  source: np.ndarray,
+) -> np.ndarray:
+  """
+  Evaluate a model on the same source with every row of a
+  (count, size) population at once. The target has a leading
+  population axis.
+  """
+  source = np.asarray(source, dtype=population.dtype)
+  views = _trace(model, source.shape).bind(population, source.ndim-2)
+  count, _ = population.shape
+  source = np.broadcast_to(source, (count, *source.shape))
+  with span('model'), _handle(_Replay(views=views)):
+    target = model(source)
   return target
 
+def patches_from_image(
+  img: np.ndarray,
+  blk_shape,
+  step=None,
+) -> np.ndarray:
+  """
+  A read-only view of the blocks of an image, shaped [*lead, tmp_hh,
+  tmp_ww, tmp_dd, blk_hh, blk_ww, blk_dd], without copying any pixels.
+  Blocks start every step pixels, and overlap when the step is smaller
+  than the block. The step defaults to the block shape.
+  """
+  step_hh, step_ww, step_dd = step or blk_shape
+  window = sliding_window_view(img, blk_shape, axis=(-3, -2, -1))
+  return window[..., ::step_hh, ::step_ww, ::step_dd, :, :, :]
+
 def tokens_from_image(
   img: np.ndarray,
   blk_shape,
+  dtype=None,
+  step=None,
 ) -> np.ndarray:
-  img_hh, img_ww, img_dd = img.shape
-  blk_hh, blk_ww, blk_dd = blk_shape
-  tmp_hh = img_hh//blk_hh
-  tmp_ww = img_ww//blk_ww
-  tmp_dd = img_dd//blk_dd
-  tmp = np.reshape(img, (tmp_hh, blk_hh, tmp_ww, blk_ww, tmp_dd, blk_dd))
-  tmp = np.transpose(tmp, [0, 2, 4, 1, 3, 5])
-  token = np.reshape(tmp, (tmp_hh*tmp_ww*tmp_dd, blk_hh*blk_ww*blk_dd))
+  # Leading axes are a batch of images, e.g. every frame of a clip.
+  img = np.asarray(img, dtype=dtype or DTYPE)
+  patch = patches_from_image(img, blk_shape, step)
+  *lead, tmp_hh, tmp_ww, tmp_dd, blk_hh, blk_ww, blk_dd = patch.shape
+  # This is a view when the blocks are laid out contiguously, and a
+  # single gather otherwise.
+  token = np.reshape(patch, (*lead, tmp_hh*tmp_ww*tmp_dd, blk_hh*blk_ww*blk_dd))
   return token
 
 def image_from_tokens(
   token: np.ndarray,
   img_shape,
   blk_shape,
+  step=None,
 ) -> np.ndarray:
+  *lead, _, _ = token.shape
   img_hh, img_ww, img_dd = img_shape
   blk_hh, blk_ww, blk_dd = blk_shape
-  tmp_hh = img_hh//blk_hh
-  tmp_ww = img_ww//blk_ww
-  tmp_dd = img_dd//blk_dd
-  tmp = np.reshape(token, (tmp_hh, tmp_ww, tmp_dd, blk_hh, blk_ww, blk_dd))
-  tmp = np.transpose(tmp, [0, 3, 1, 4, 2, 5])
-  img = np.reshape(tmp, (img_hh, img_ww, img_dd))
-  return img
+  step_hh, step_ww, step_dd = step or blk_shape
+  tmp_hh = (img_hh-blk_hh)//step_hh+1
+  tmp_ww = (img_ww-blk_ww)//step_ww+1
+  tmp_dd = (img_dd-blk_dd)//step_dd+1
+  tmp = np.reshape(token, (*lead, tmp_hh, tmp_ww, tmp_dd, blk_hh, blk_ww, blk_dd))
+  tiled = (
+    tuple(step or blk_shape) == tuple(blk_shape)
+    and (tmp_hh*blk_hh, tmp_ww*blk_ww, tmp_dd*blk_dd) == tuple(img_shape)
+  )
+  if tiled:
+    tmp = np.transpose(tmp, _batch_axes(lead, [0, 3, 1, 4, 2, 5]))
+    img = np.reshape(tmp, (*lead, img_hh, img_ww, img_dd))
+    return img
+  # Overlap-add every block back into place, then divide by how many
+  # blocks covered each pixel. Pixels no block covers stay zero.
+  img = np.zeros((*lead, img_hh, img_ww, img_dd), dtype=token.dtype)
+  count = np.zeros((img_hh, img_ww, img_dd), dtype=token.dtype)
+  for blk_y in range(0, blk_hh):
+    y = slice(blk_y, blk_y+tmp_hh*step_hh, step_hh)
+    for blk_x in range(0, blk_ww):
+      x = slice(blk_x, blk_x+tmp_ww*step_ww, step_ww)
+      for blk_z in range(0, blk_dd):
+        z = slice(blk_z, blk_z+tmp_dd*step_dd, step_dd)
+        img[..., y, x, z] += tmp[..., blk_y, blk_x, blk_z]
+        count[y, x, z] += 1
+  return img/np.maximum(count, 1)
+
+def _batch_axes(lead, axes):
+  count = len(lead)
+  return [*range(0, count), *[count+axis for axis in axes]]
@@ -0,0 +1,153 @@
+import numpy as np
+import nn_2022_07_12 as nn
+
+# Run with python -m pytest nn_2022_07_12_test.py. Parameters are
+# scaled down so float32 rounding stays small next to the tolerance.
+
+SEQ = 24
+DIM = 8
+
+def full(value):
+  return nn.transformer(value, heads=2)
+
+def chunked(value):
+  return nn.transformer(value, heads=2, chunk=5)
+
+def causal(value):
+  return nn.transformer(value, heads=2, causal=True)
+
+def causal_chunked(value):
+  return nn.transformer(value, heads=2, chunk=5, causal=True)
+
+def setup(model, shape=(SEQ, DIM), seed=0):
+  rng = np.random.default_rng(seed)
+  param = 0.1*nn.init(model, shape, rng=rng)
+  source = rng.standard_normal(shape)
+  return param, source
+
+def test_chunked_attention_matches_full():
+  param, source = setup(full)
+  expected = nn.eval(full, param, source)
+  actual = nn.eval(chunked, param, source)
+  assert np.allclose(actual, expected, atol=1e-5)
+
+def test_chunked_attention_matches_full_in_a_batch():
+  param, source = setup(full, (3, SEQ, DIM))
+  expected = nn.eval(full, param, source)
+  actual = nn.eval(chunked, param, source)
+  assert np.allclose(actual, expected, atol=1e-5)
+
+def test_chunked_causal_attention_matches_full():
+  param, source = setup(causal)
+  expected = nn.eval(causal, param, source)
+  actual = nn.eval(causal_chunked, param, source)
+  assert np.allclose(actual, expected, atol=1e-5)
+
+def test_decode_matches_causal_eval():
+  param, source = setup(causal)
+  expected = nn.eval(causal, param, source)
+  for model in [causal, causal_chunked]:
+    cache = nn.Cache()
+    actual = [
+      nn.decode(model, param, source[index:index+1], cache)
+      for index in range(0, SEQ)
+    ]
+    assert len(cache) == SEQ
+    assert np.allclose(np.concatenate(actual), expected, atol=1e-5)
+
+def test_decode_in_steps_matches_causal_eval():
+  param, source = setup(causal)
+  expected = nn.eval(causal, param, source)
+  cache = nn.Cache()
+  actual = [
+    nn.decode(causal, param, source[lhs:lhs+7], cache)
+    for lhs in range(0, SEQ, 7)
+  ]
+  assert np.allclose(np.concatenate(actual), expected, atol=1e-5)
+
+def test_patches_round_trip():
+  img = np.random.default_rng(0).standard_normal((2, 12, 16, 3))
+  token = nn.tokens_from_image(img, (4, 4, 3), dtype=np.float64)
+  assert token.shape == (2, 12, 48)
+  actual = nn.image_from_tokens(token, (12, 16, 3), (4, 4, 3))
+  assert np.array_equal(actual, img)
+
+def test_overlapping_patches_round_trip():
+  img = np.random.default_rng(0).standard_normal((13, 18, 3))
+  blk_shape, step = (5, 5, 3), (2, 3, 3)
+  token = nn.tokens_from_image(img, blk_shape, np.float64, step)
+  assert token.shape == (5*5, 5*5*3)
+  actual = nn.image_from_tokens(token, img.shape, blk_shape, step)
+  # The last column isn't covered by any block, and stays zero.
+  assert np.allclose(actual[:, :17], img[:, :17])
+  assert np.all(actual[:, 17:] == 0)
+
+def test_float32_end_to_end():
+  img = np.zeros((8, 8, 3), dtype=np.uint8)
+  assert nn.tokens_from_image(img, (4, 4, 3)).dtype == np.float32
+  param, source = setup(causal_chunked)
+  assert param.dtype == np.float32
+  assert nn.eval(causal_chunked, param, source).dtype == np.float32
+  cache = nn.Cache()
+  assert nn.decode(causal, param, source[:3], cache).dtype == np.float32
+  population = nn.init(full, (SEQ, DIM), count=3)
+  assert population.dtype == np.float32
+  target = nn.eval_population(full, population, source)
+  assert target.dtype == np.float32
+
+def test_dtype_follows_the_parameters():
+  param = nn.init(full, (SEQ, DIM), dtype=np.float64)
+  source = np.zeros((SEQ, DIM), dtype=np.float32)
+  assert nn.eval(full, param, source).dtype == np.float64
+
+def test_population_matches_every_row():
+  rng = np.random.default_rng(0)
+  population = 0.1*nn.init(causal, (SEQ, DIM), count=4, rng=rng)
+  for shape in [(SEQ, DIM), (2, SEQ, DIM)]:
+    source = rng.standard_normal(shape)
+    actual = nn.eval_population(causal, population, source)
+    assert actual.shape == (4, *shape)
+    for index in range(0, 4):
+      expected = nn.eval(causal, population[index:index+1], source)
+      assert np.allclose(actual[index], expected, atol=1e-5)
+
+def test_alternating_parameters_stay_bound():
+  param, source = setup(full)
+  other = 0.1*nn.init(full, (SEQ, DIM), rng=np.random.default_rng(1))
+  plan = nn._trace(full, source.shape)
+  views = plan.bind(param)
+  assert plan.bind(other) is not views
+  assert plan.bind(param) is views
+  assert plan.bind(param, 0) is not views
+  expected = nn.eval(full, other, source)
+  nn.eval(full, param, source)
+  assert np.array_equal(nn.eval(full, other, source), expected)
+
+class Model:
+  def __init__(self, heads):
+    self.heads = heads
+
+  def apply(self, value):
+    return nn.transformer(value, heads=self.heads)
+
+class SlottedModel:
+  __slots__ = ['heads']
+
+  def __init__(self, heads):
+    self.heads = heads
+
+  def __call__(self, value):
+    return nn.transformer(value, heads=self.heads)
+
+def test_bound_methods_share_a_plan():
+  model = Model(heads=2)
+  assert model.apply is not model.apply
+  plan = nn._trace(model.apply, (SEQ, DIM))
+  assert nn._trace(model.apply, (SEQ, DIM)) is plan
+  assert nn._trace(Model(heads=2).apply, (SEQ, DIM)) is not plan
+
+def test_models_without_weak_references_still_evaluate():
+  model = SlottedModel(heads=2)
+  param, source = setup(model)
+  expected = nn.eval(full, param, source)
+  assert np.allclose(nn.eval(model, param, source), expected)
@@ -0,0 +1,70 @@
+import math
+import numpy as np
+import opensimplex as simplex
+
+tau = 2*math.pi
+
+class NoiseVolume:
+  """
+  Simplex noise over a square of the plane, looping in time, sampled
+  on a grid once and read back with trilinear lookups. Time walks a
+  circle through the last two axes of 4D noise, so the volume wraps
+  seamlessly after period seconds; speed is how far the noise moves
+  per second, like the time coordinate of noise3(speed*t, x, y).
+
+  Building costs frames*size*size noise evaluations, after which a
+  whole batch of points samples in a few array operations.
+  """
+  period: float
+  lhs: float
+  rhs: float
+
+  def __init__(
+    self,
+    period: float,
+    speed: float = 1,
+    lhs: float = -1,
+    rhs: float = 1,
+    frames: int = 32,
+    size: int = 33,
+  ):
+    assert rhs > lhs
+    self.period = period
+    self.lhs = lhs
+    self.rhs = rhs
+    radius = period*speed/tau
+    axis = np.linspace(lhs, rhs, size)
+    self._volume = np.empty((frames, size, size))
+    for k in range(0, frames):
+      theta = tau*k/frames
+      self._volume[k] = simplex.noise4array(
+        axis,
+        axis,
+        np.array([radius*math.cos(theta)]),
+        np.array([radius*math.sin(theta)]),
+      )[0, 0]
+
+  def sample(self, time, x, y) -> np.ndarray:
+    """
+    Noise at broadcast arrays of time, x and y. Points outside the
+    square take the value at its edge.
+    """
+    frames, size, _ = self._volume.shape
+    time, x, y = np.broadcast_arrays(time, x, y)
+    pos_t = np.mod(time/self.period, 1)*frames
+    pos_x = np.clip((x-self.lhs)/(self.rhs-self.lhs), 0, 1)*(size-1)
+    pos_y = np.clip((y-self.lhs)/(self.rhs-self.lhs), 0, 1)*(size-1)
+    lhs_t = np.floor(pos_t).astype(int)%frames
+    lhs_x = np.minimum(np.floor(pos_x).astype(int), size-2)
+    lhs_y = np.minimum(np.floor(pos_y).astype(int), size-2)
+    frac_t = pos_t-np.floor(pos_t)
+    frac_x = pos_x-lhs_x
+    frac_y = pos_y-lhs_y
+    rhs_t = (lhs_t+1)%frames
+    value = 0
+    for t, weight_t in [(lhs_t, 1-frac_t), (rhs_t, frac_t)]:
+      for dy, weight_y in [(0, 1-frac_y), (1, frac_y)]:
+        for dx, weight_x in [(0, 1-frac_x), (1, frac_x)]:
+          corner = self._volume[t, lhs_y+dy, lhs_x+dx]
+          value = value+weight_t*weight_y*weight_x*corner
+    return value
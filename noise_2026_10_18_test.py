@@ -0,0 +1,43 @@
+import math
+import numpy as np
+import opensimplex as simplex
+from noise_2026_10_18 import NoiseVolume
+
+# Run with python -m pytest noise_2026_10_18_test.py.
+
+tau = 2*math.pi
+
+def test_volume_loops_after_period():
+  noise = NoiseVolume(period=6, frames=16, size=9)
+  rng = np.random.default_rng(0)
+  time = rng.uniform(0, 6, 100)
+  x = rng.uniform(-1, 1, 100)
+  y = rng.uniform(-1, 1, 100)
+  expected = noise.sample(time, x, y)
+  assert np.allclose(noise.sample(time+6, x, y), expected)
+  assert np.allclose(noise.sample(time-12, x, y), expected)
+
+def test_volume_is_continuous_across_the_loop():
+  noise = NoiseVolume(period=6, frames=16, size=9)
+  x = np.linspace(-1, 1, 50)
+  before = noise.sample(6-1e-6, x, 0.3)
+  after = noise.sample(0, x, 0.3)
+  assert np.allclose(before, after, atol=1e-4)
+
+def test_volume_matches_noise_on_its_grid():
+  period, speed, frames, size = 3, 2, 8, 5
+  noise = NoiseVolume(period, speed, frames=frames, size=size)
+  radius = period*speed/tau
+  axis = np.linspace(-1, 1, size)
+  for k in [0, 3]:
+    theta = tau*k/frames
+    for x in axis:
+      for y in axis:
+        expected = simplex.noise4(
+          x, y, radius*math.cos(theta), radius*math.sin(theta))
+        actual = noise.sample(period*k/frames, x, y)
+        assert np.isclose(actual, expected)
+
+def test_points_outside_take_the_edge():
+  noise = NoiseVolume(period=1, frames=4, size=5)
+  assert np.isclose(noise.sample(0.1, 5, -5), noise.sample(0.1, 1, -1))
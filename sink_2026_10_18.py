@@ -0,0 +1,191 @@
+import os
+import sys
+import queue
+import threading
+import subprocess
+import cairo
+
+# A sink takes rendered frames off the render loop. Every frame is
+# copied into a bounded queue and encoded on a background thread, so
+# drawing frame N+1 overlaps with writing frame N, and a slow pipe or
+# encoder only stalls drawing once the queue is full.
+
+class Frame:
+  data: bytes
+  width: int
+  height: int
+  stride: int
+  index: int
+
+  def __init__(self, data, width, height, stride, index):
+    self.data = data
+    self.width = width
+    self.height = height
+    self.stride = stride
+    self.index = index
+
+class Sink:
+  depth: int
+  _count: int = 0
+
+  def __init__(self, depth: int = 2):
+    self.depth = depth
+    self._count = 0
+    self._error = None
+    self._queue = queue.Queue(maxsize=depth)
+    self._thread = threading.Thread(target=self._run, daemon=True)
+    self._thread.start()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *_):
+    self.close()
+
+  def write(self, surface: cairo.ImageSurface):
+    """
+    Copy the pixels of a surface and queue them for encoding.
+    """
+    surface.flush()
+    self.write_data(
+      data=bytes(surface.get_data()),
+      width=surface.get_width(),
+      height=surface.get_height(),
+      stride=surface.get_stride(),
+    )
+
+  def write_data(self, data: bytes, width: int, height: int, stride: int):
+    """
+    Queue ARGB32 pixels that were already copied off a surface, e.g.
+    by a worker process.
+    """
+    if self._error is not None:
+      raise self._error
+    frame = Frame(data, width, height, stride, index=self._count)
+    self._queue.put(frame)
+    self._count += 1
+
+  def close(self):
+    """
+    Wait for every queued frame to be encoded and finish the output.
+    The output is finished even after an encode error, which is raised
+    once it's cleaned up.
+    """
+    self._queue.put(None)
+    self._thread.join()
+    try:
+      self.finish()
+    finally:
+      if self._error is not None:
+        raise self._error
+
+  def encode(self, frame: Frame):
+    pass
+
+  def finish(self):
+    pass
+
+  def _run(self):
+    while True:
+      frame = self._queue.get()
+      if frame is None:
+        return
+      if self._error is not None:
+        # Keep draining so the render loop never blocks on a dead sink.
+        continue
+      try:
+        self.encode(frame)
+      except Exception as error:
+        self._error = error
+
+class RawSink(Sink):
+  """
+  Write raw ARGB32 frames to a stream, standard output by default.
+  """
+  def __init__(self, stream=None, depth: int = 2):
+    self.stream = stream or sys.stdout.buffer
+    super().__init__(depth)
+
+  def encode(self, frame: Frame):
+    self.stream.write(frame.data)
+
+  def finish(self):
+    self.stream.flush()
+
+class PngSink(Sink):
+  """
+  Write every frame as a PNG. The pattern is formatted with the
+  1-based frame number, like 'bin/frame-{:03d}.png'.
+  """
+  def __init__(self, pattern: str, depth: int = 2):
+    self.pattern = pattern
+    super().__init__(depth)
+
+  def encode(self, frame: Frame):
+    surface = cairo.ImageSurface.create_for_data(
+      bytearray(frame.data),
+      cairo.FORMAT_ARGB32,
+      frame.width,
+      frame.height,
+      frame.stride,
+    )
+    surface.write_to_png(self.pattern.format(frame.index+1))
+
+class GifSink(Sink):
+  """
+  Encode frames into a GIF with an ffmpeg process, which runs
+  alongside the renderer.
+  """
+  def __init__(self, path: str, framerate: int = 15, depth: int = 2):
+    self.path = path
+    self.framerate = framerate
+    self._process = None
+    super().__init__(depth)
+
+  def encode(self, frame: Frame):
+    if self._process is None:
+      # cairo's ARGB32 is native-endian, i.e. BGRA bytes on x86/ARM.
+      self._process = subprocess.Popen(
+        [
+          'ffmpeg', '-loglevel', 'error', '-y',
+          '-f', 'rawvideo',
+          '-pix_fmt', 'bgra',
+          '-video_size', f'{frame.stride//4}x{frame.height}',
+          '-framerate', str(self.framerate),
+          '-i', '-',
+          '-vf', (
+            f'crop={frame.width}:{frame.height}:0:0,'
+            'split[a][b];[a]palettegen[p];[b][p]paletteuse'
+          ),
+          self.path,
+        ],
+        stdin=subprocess.PIPE,
+      )
+    self._process.stdin.write(frame.data)
+
+  def finish(self):
+    if self._process is None:
+      return
+    if self._error is not None:
+      # Frames are missing, so don't let ffmpeg write a GIF of the ones
+      # before the error.
+      self._process.kill()
+    # Always reap ffmpeg, even if it died and its pipe broke.
+    try:
+      self._process.stdin.close()
+    except BrokenPipeError:
+      pass
+    finally:
+      code = self._process.wait()
+    if self._error is not None:
+      try:
+        os.remove(self.path)
+      except FileNotFoundError:
+        pass
+    elif code != 0:
+      raise Exception(f'gif: ffmpeg failed writing {self.path}')
+
+class NullSink(Sink):
+  """
+  Throw frames away, e.g. to time a render without any output.
+  """
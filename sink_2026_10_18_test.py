@@ -0,0 +1,91 @@
+import sys
+import pytest
+pytest.importorskip('cairo')
+import sink_2026_10_18 as sink
+
+# Run with python -m pytest sink_2026_10_18_test.py.
+
+FRAME = bytes(2*2*4)
+
+class Failing(sink.Sink):
+  """
+  A sink whose encoder fails on one frame.
+  """
+  def __init__(self, fail_at):
+    self.fail_at = fail_at
+    self.encoded = []
+    super().__init__(depth=1)
+
+  def encode(self, frame):
+    if frame.index == self.fail_at:
+      raise ValueError(f'frame {frame.index}')
+    self.encoded.append(frame.index)
+
+def test_frames_are_encoded_in_order():
+  output = Failing(fail_at=None)
+  with output:
+    for _ in range(0, 5):
+      output.write_data(FRAME, 2, 2, 8)
+  assert output.encoded == [0, 1, 2, 3, 4]
+
+def test_encode_error_reaches_close():
+  output = Failing(fail_at=0)
+  output.write_data(FRAME, 2, 2, 8)
+  with pytest.raises(ValueError, match='frame 0'):
+    output.close()
+
+def test_encode_error_stops_the_render_loop():
+  # A later write raises the error instead of queueing forever; the
+  # sink keeps draining, so the writer never blocks on a full queue.
+  output = Failing(fail_at=1)
+  with pytest.raises(ValueError, match='frame 1'):
+    with output:
+      for _ in range(0, 100):
+        output.write_data(FRAME, 2, 2, 8)
+  assert output.encoded == [0]
+
+class Finishing(Failing):
+  finished = False
+
+  def finish(self):
+    self.finished = True
+
+def test_output_is_finished_after_an_encode_error():
+  output = Finishing(fail_at=0)
+  output.write_data(FRAME, 2, 2, 8)
+  with pytest.raises(ValueError, match='frame 0'):
+    output.close()
+  assert output.finished
+
+class FailingGif(sink.GifSink):
+  """
+  A GIF sink whose encoder fails after its first frame.
+  """
+  def encode(self, frame):
+    if frame.index == 1:
+      raise ValueError(f'frame {frame.index}')
+    super().encode(frame)
+
+def test_gif_is_reaped_and_removed_after_an_encode_error(
+  monkeypatch, tmp_path,
+):
+  # Stand in for ffmpeg with a process that copies its input to the
+  # output path until it's closed or killed.
+  copy = (
+    'import sys, shutil; '
+    'shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], "wb"))'
+  )
+  started = []
+  spawn = sink.subprocess.Popen
+  def popen(args, **kwargs):
+    started.append(spawn([sys.executable, '-c', copy, args[-1]], **kwargs))
+    return started[-1]
+  monkeypatch.setattr(sink.subprocess, 'Popen', popen)
+  path = tmp_path/'out.gif'
+  output = FailingGif(str(path))
+  output.write_data(FRAME, 2, 2, 8)
+  output.write_data(FRAME, 2, 2, 8)
+  with pytest.raises(ValueError, match='frame 1'):
+    output.close()
+  assert started[0].returncode is not None
+  assert not path.exists()
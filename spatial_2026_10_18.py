@@ -0,0 +1,50 @@
+import math
+from collections import defaultdict
+
+class SpatialHash:
+  """
+  A uniform grid of discs for overlap queries. Every disc is filed
+  under each cell its bounding box touches, so a query only looks at
+  discs in the cells around it; with discs about the size of a cell
+  that's a handful of cells, and inserting and querying take expected
+  constant time however many discs there are.
+  """
+  cell: float
+
+  def __init__(self, cell: float = 2/64):
+    assert cell > 0
+    self.cell = cell
+    self.clear()
+
+  def __len__(self) -> int:
+    return len(self._discs)
+
+  def clear(self):
+    self._grid = defaultdict(list)
+    self._discs = []
+
+  def insert(self, x: float, y: float, radius: float):
+    index = len(self._discs)
+    self._discs.append((x, y, radius))
+    for key in self._cells(x, y, radius):
+      self._grid[key].append(index)
+
+  def collides(self, x: float, y: float, radius: float) -> bool:
+    """
+    Whether a disc touches or overlaps any disc already inserted.
+    """
+    for key in self._cells(x, y, radius):
+      for index in self._grid.get(key, ()):
+        rx, ry, rradius = self._discs[index]
+        if math.hypot(x-rx, y-ry) <= radius+rradius:
+          return True
+    return False
+
+  def _cells(self, x, y, radius):
+    lhs_x = math.floor((x-radius)/self.cell)
+    rhs_x = math.floor((x+radius)/self.cell)
+    lhs_y = math.floor((y-radius)/self.cell)
+    rhs_y = math.floor((y+radius)/self.cell)
+    for i in range(lhs_x, rhs_x+1):
+      for j in range(lhs_y, rhs_y+1):
+        yield (i, j)
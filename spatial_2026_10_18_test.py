@@ -0,0 +1,40 @@
+import math
+import numpy as np
+from spatial_2026_10_18 import SpatialHash
+
+# Run with python -m pytest spatial_2026_10_18_test.py.
+
+def brute_force(discs, x, y, radius):
+  return any(
+    math.hypot(x-rx, y-ry) <= radius+rradius
+    for rx, ry, rradius in discs
+  )
+
+def test_collides_matches_brute_force():
+  rng = np.random.default_rng(0)
+  for cell in [2/64, 0.3]:
+    index = SpatialHash(cell)
+    discs = []
+    for x, y, radius in zip(
+      rng.uniform(-1, 1, 500),
+      rng.uniform(-1, 1, 500),
+      rng.uniform(0, 0.1, 500),
+    ):
+      assert index.collides(x, y, radius) == brute_force(discs, x, y, radius)
+      if rng.uniform() < 0.5:
+        index.insert(x, y, radius)
+        discs.append((x, y, radius))
+    assert len(index) == len(discs)
+
+def test_touching_discs_collide():
+  index = SpatialHash(0.1)
+  index.insert(0, 0, 0.25)
+  assert index.collides(0.5, 0, 0.25)
+  assert not index.collides(0.51, 0, 0.25)
+
+def test_clear_forgets_every_disc():
+  index = SpatialHash()
+  index.insert(0, 0, 1)
+  index.clear()
+  assert len(index) == 0
+  assert not index.collides(0, 0, 1)
@@ -0,0 +1,176 @@
+import numpy as np
+import cairo
+
+# Rasterize antialiased discs with NumPy straight into an ARGB32
+# surface. The surface is cut into fixed square tiles and every dot is
+# binned into the tiles its disc can reach, so each tile holds a list
+# of its dots in drawing order. Then the dots are drawn in rounds: in
+# round k every tile with more than k dots composites its k-th dot over
+# all of its pixels at once, with coverage from the signed distance to
+# the disc's edge. Dots land on each pixel in the order given, like a
+# sequence of cairo fills, but the surface's clip is ignored.
+
+# Pixels on a side of a tile. Small tiles waste little work on pixels
+# a disc doesn't reach, at the cost of more dots per tile, so more
+# rounds.
+TILE = 8
+
+# Bounds the (tile, dot) pairs held at once; more dots than this are
+# drawn in consecutive batches, which keeps the compositing order.
+# Every batch writes its tiles back to the surface, rounded to bytes
+# like a cairo fill.
+PAIR_BUDGET = 1 << 20
+
+def splat(
+  surface: cairo.ImageSurface,
+  matrix: cairo.Matrix,
+  centers: np.ndarray,
+  radii: np.ndarray,
+  colors: np.ndarray,
+):
+  """
+  Draw (n, 2) centers with (n,) radii in the user space of matrix, in
+  (n, 4) straight RGBA colors between 0 and 1.
+  """
+  centers = np.reshape(np.asarray(centers, dtype=np.float64), (-1, 2))
+  count = len(centers)
+  radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), (count,))
+  colors = np.broadcast_to(np.asarray(colors, dtype=np.float64), (count, 4))
+  if count == 0:
+    return
+
+  # Move everything to device space. Radii assume a uniform scale.
+  xx, yx, xy, yy, x0, y0 = matrix
+  user_x, user_y = centers[:, 0], centers[:, 1]
+  dev_x = xx*user_x+xy*user_y+x0
+  dev_y = yx*user_x+yy*user_y+y0
+  dev_r = radii*np.sqrt(abs(xx*yy-xy*yx))
+  red, green, blue, alpha = colors.T
+  source = np.stack([blue*alpha, green*alpha, red*alpha, alpha], axis=1)
+
+  # A pixel center within r+0.5 of a dot's center has some coverage;
+  # these are the tiles holding such pixels, rhs exclusive.
+  width = surface.get_width()
+  height = surface.get_height()
+  tiles_x = -(-width//TILE)
+  tiles_y = -(-height//TILE)
+  lhs_x = np.clip(np.floor((dev_x-dev_r-0.5)/TILE), 0, tiles_x)
+  rhs_x = np.clip(np.floor((dev_x+dev_r+0.5)/TILE)+1, 0, tiles_x)
+  lhs_y = np.clip(np.floor((dev_y-dev_r-0.5)/TILE), 0, tiles_y)
+  rhs_y = np.clip(np.floor((dev_y+dev_r+0.5)/TILE)+1, 0, tiles_y)
+  lhs_x, rhs_x = lhs_x.astype(np.int64), rhs_x.astype(np.int64)
+  lhs_y, rhs_y = lhs_y.astype(np.int64), rhs_y.astype(np.int64)
+  area = (rhs_x-lhs_x)*(rhs_y-lhs_y)*(alpha > 0)
+
+  # Every pixel as one 32-bit word of a flat view of the surface,
+  # strides and all; only the tiles a batch draws on are read and
+  # written back.
+  surface.flush()
+  line = surface.get_stride()//4
+  pixels = np.ndarray(
+    (height*line,), dtype=np.uint32, buffer=surface.get_data())
+  dev_r = dev_r.astype(np.float32)
+  source = source.astype(np.float32)
+
+  start = 0
+  total = np.cumsum(area)
+  while start < count:
+    limit = total[start]-area[start]+PAIR_BUDGET
+    stop = max(start+1, np.searchsorted(total, limit, side='right'))
+    _composite(
+      pixels, line, width, height, tiles_x, tiles_y, source,
+      np.arange(start, stop),
+      dev_x, dev_y, dev_r,
+      lhs_x, rhs_x, lhs_y, area,
+    )
+    start = stop
+  surface.mark_dirty()
+
+def _composite(
+  pixels, line, width, height, tiles_x, tiles_y, source, dots,
+  dev_x, dev_y, dev_r,
+  lhs_x, rhs_x, lhs_y, area,
+):
+  # Every (tile, dot) pair of the batch, generated in dot order.
+  span = area[dots]
+  if span.sum() == 0:
+    return
+  span_x = np.repeat((rhs_x-lhs_x)[dots], span)
+  pair_dot = np.repeat(dots, span)
+  local = np.arange(span.sum())-np.repeat(np.cumsum(span)-span, span)
+  pair_x = lhs_x[pair_dot]+local%span_x
+  pair_y = lhs_y[pair_dot]+local//span_x
+
+  # Drop the corner tiles of a box the disc itself doesn't reach.
+  near_x = np.clip(dev_x[pair_dot], pair_x*TILE, (pair_x+1)*TILE)
+  near_y = np.clip(dev_y[pair_dot], pair_y*TILE, (pair_y+1)*TILE)
+  reach = np.hypot(near_x-dev_x[pair_dot], near_y-dev_y[pair_dot])
+  hit = reach < dev_r[pair_dot]+0.5
+  pair_dot = pair_dot[hit]
+  pair_tile = pair_y[hit]*tiles_x+pair_x[hit]
+  if len(pair_tile) == 0:
+    return
+
+  # Bin the pairs by tile. NumPy's stable sort on 16-bit keys is a
+  # radix sort, and it keeps every tile's dots in drawing order.
+  small = tiles_x*tiles_y <= 1 << 16
+  key = pair_tile.astype(np.uint16 if small else np.int64)
+  order = np.argsort(key, kind='stable')
+  pair_dot, pair_tile = pair_dot[order], pair_tile[order]
+  head = np.flatnonzero(np.diff(pair_tile, prepend=-1))
+  used = pair_tile[head]
+  count = np.diff(np.append(head, len(pair_tile)))
+
+  # Tiles with the most dots go first, so the tiles still drawing in
+  # any round are a prefix of them.
+  busy = np.argsort(-count, kind='stable')
+  used, head, count = used[busy], head[busy], count[busy]
+  tile_y, tile_x = np.divmod(used, tiles_x)
+
+  # Gather the pixels of those tiles, channels first so every operation
+  # runs along a tile's pixels. Tiles on the right and bottom edges can
+  # hang off the surface; they read edge pixels there and never write
+  # them back.
+  row = (tile_y*TILE)[:, None]+np.arange(TILE)
+  col = (tile_x*TILE)[:, None]+np.arange(TILE)
+  inside = (row < height)[:, :, None] & (col < width)[:, None, :]
+  inside = np.reshape(inside, (len(used), TILE*TILE))
+  spot = (
+    np.minimum(row, height-1)[:, :, None]*line
+    +np.minimum(col, width-1)[:, None, :]
+  )
+  spot = np.reshape(spot, (len(used), TILE*TILE))
+  block = np.reshape(pixels[spot].view(np.uint8), (len(used), TILE*TILE, 4))
+  block = np.moveaxis(block, -1, 1).astype(np.float32, order='C')
+  block *= 1/255
+
+  # Pixel centers from the corner of every tile; the squared distance
+  # to a dot is a sum of a row term and a column term. Offsets are
+  # taken in float64 and only then rounded, so a pixel's coverage
+  # doesn't depend on where the surface starts, and tiles of a frame
+  # match the whole.
+  grid = np.arange(TILE)+0.5
+  base_x = tile_x*TILE
+  base_y = tile_y*TILE
+
+  # Over-compositing, one dot per tile per round.
+  active = len(used)
+  for index in range(0, count[0]):
+    while count[active-1] <= index:
+      active -= 1
+    dot = pair_dot[head[:active]+index]
+    dx = (base_x[:active]-dev_x[dot])[:, None]+grid
+    dy = (base_y[:active]-dev_y[dot])[:, None]+grid
+    dx = np.square(dx.astype(np.float32))
+    dy = np.square(dy.astype(np.float32))
+    cover = np.reshape(dy[:, :, None]+dx[:, None, :], (active, TILE*TILE))
+    np.sqrt(cover, out=cover)
+    np.subtract(dev_r[dot][:, None]+0.5, cover, out=cover)
+    np.clip(cover, 0, 1, out=cover)
+    paint = source[dot]
+    target = block[:active]
+    target *= (1-cover*paint[:, 3:])[:, None, :]
+    target += cover[:, None, :]*paint[:, :, None]
+  block *= 255
+  block = np.round(np.moveaxis(block, 1, -1)).astype(np.uint8, order='C')
+  pixels[spot[inside]] = np.reshape(block.view(np.uint32), spot.shape)[inside]
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+cairo = pytest.importorskip('cairo')
+import splat_2026_10_18 as splat
+
+# Run with python -m pytest splat_2026_10_18_test.py.
+
+def surface_of(pixels):
+  height, width, _ = pixels.shape
+  surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+  data = view_of(surface)
+  data[:] = pixels
+  surface.mark_dirty()
+  return surface
+
+def view_of(surface):
+  surface.flush()
+  height = surface.get_height()
+  stride = surface.get_stride()
+  data = np.ndarray(
+    (height, stride//4, 4), dtype=np.uint8, buffer=surface.get_data())
+  return data[:, :surface.get_width()]
+
+def brute_force(pixels, matrix, centers, radii, colors):
+  # Every dot over every pixel, in order, in float64.
+  height, width, _ = pixels.shape
+  target = pixels/255
+  xx, yx, xy, yy, x0, y0 = matrix
+  py, px = np.mgrid[0:height, 0:width]+0.5
+  for (x, y), radius, (red, green, blue, alpha) in zip(centers, radii, colors):
+    dev_x = xx*x+xy*y+x0
+    dev_y = yx*x+yy*y+y0
+    dev_r = radius*np.sqrt(abs(xx*yy-xy*yx))
+    cover = np.clip(dev_r+0.5-np.hypot(px-dev_x, py-dev_y), 0, 1)
+    paint = np.array([blue*alpha, green*alpha, red*alpha, alpha])
+    target = target*(1-cover*alpha)[:, :, None]+cover[:, :, None]*paint
+  return np.round(target*255)
+
+@pytest.mark.parametrize('budget', [splat.PAIR_BUDGET, 16])
+def test_splat_matches_brute_force(monkeypatch, budget):
+  monkeypatch.setattr(splat, 'PAIR_BUDGET', budget)
+  rng = np.random.default_rng(0)
+  width, height = 37, 21
+  pixels = np.zeros((height, width, 4), dtype=np.uint8)
+  pixels[:] = [40, 30, 20, 255]
+  count = 200
+  # NDC, like the sketches, with dots hanging off every edge.
+  matrix = cairo.Matrix(width/2, 0, 0, height/2, width/2, height/2)
+  centers = rng.uniform(-1.2, 1.2, (count, 2))
+  radii = rng.uniform(0, 0.3, count)
+  colors = rng.uniform(0, 1, (count, 4))
+  surface = surface_of(pixels)
+  splat.splat(surface, matrix, centers, radii, colors)
+  expected = brute_force(pixels, matrix, centers, radii, colors)
+  actual = view_of(surface).astype(np.float64)
+  assert np.max(abs(actual-expected)) <= 1
+
+def test_splat_without_dots_leaves_the_surface():
+  pixels = np.full((9, 9, 4), 7, dtype=np.uint8)
+  surface = surface_of(pixels)
+  splat.splat(surface, cairo.Matrix(), np.zeros((0, 2)), 1, np.zeros((0, 4)))
+  assert np.array_equal(view_of(surface), pixels)
@@ -0,0 +1,63 @@
+import math
+import cairo
+
+tau = 2*math.pi
+
+# Symmetric pictures draw a fundamental region once and replicate it.
+# The region is recorded as vector commands, so every copy is
+# rasterized at full resolution under its own transform, but the work
+# that produced the commands (evaluating a field, walking a grid) only
+# happens once.
+
+def recording():
+  """
+  Return an unbounded recording surface and a context drawing into it.
+  """
+  surface = cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA, None)
+  context = cairo.Context(surface)
+  return [surface, context]
+
+def replicate(ctx: cairo.Context, surface: cairo.Surface, group):
+  """
+  Paint a recorded region once per transform in a group, each relative
+  to the current transform of the context.
+  """
+  for matrix in group:
+    ctx.save()
+    ctx.transform(matrix)
+    ctx.set_source_surface(surface, 0, 0)
+    ctx.paint()
+    ctx.restore()
+
+def quadrants():
+  """
+  Shrink [-1, 1] into each quadrant, mirrored so every copy touches
+  the center: upper left, upper right, lower left, lower right.
+  """
+  return [
+    cairo.Matrix(xx=+0.5, yy=+0.5, x0=-0.5, y0=-0.5),
+    cairo.Matrix(xx=-0.5, yy=+0.5, x0=+0.5, y0=-0.5),
+    cairo.Matrix(xx=+0.5, yy=-0.5, x0=-0.5, y0=+0.5),
+    cairo.Matrix(xx=-0.5, yy=-0.5, x0=+0.5, y0=+0.5),
+  ]
+
+def cyclic(n: int):
+  """
+  Rotate the region n times about the origin.
+  """
+  group = []
+  for k in range(0, n):
+    theta = tau*k/n
+    group.append(cairo.Matrix(
+      xx=math.cos(theta), yx=math.sin(theta),
+      xy=-math.sin(theta), yy=math.cos(theta),
+    ))
+  return group
+
+def dihedral(n: int):
+  """
+  The n rotations of cyclic(n), plus each of them after a flip across
+  the x axis: an n-fold kaleidoscope.
+  """
+  flip = cairo.Matrix(yy=-1)
+  return cyclic(n)+[flip.multiply(matrix) for matrix in cyclic(n)]
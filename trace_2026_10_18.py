@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import threading
+import numpy as np
+from time import perf_counter
+from contextlib import contextmanager, nullcontext
+
+# Where does frame time go? Code marks its phases with span(name),
+# which costs nothing unless a Tracer is in use. render() marks the
+# app step ('app') and the hand-off to the sink ('write'), nn marks
+# model evaluation ('model'), and the brushes mark rasterization
+# ('raster'). Spans nest, so a summary reports both the time inside a
+# phase and its self time, excluding phases nested in it.
+
+_tracer = None
+_nothing = nullcontext()
+
+def use_tracer(tracer):
+  global _tracer
+  _tracer = tracer
+
+def tracing() -> bool:
+  return _tracer is not None
+
+def set_frame(frame: int):
+  if _tracer is not None:
+    _tracer.frame = frame
+
+def take() -> list:
+  """
+  Remove and return the events traced so far in this process.
+  """
+  if _tracer is None:
+    return []
+  return _tracer.take()
+
+def absorb(events: list):
+  """
+  Add events traced elsewhere, e.g. by a worker process.
+  """
+  if _tracer is not None:
+    _tracer.events.extend(events)
+
+def span(name: str):
+  """
+  Time a block as a phase of the current frame, if tracing.
+  """
+  if _tracer is None:
+    return _nothing
+  return _tracer.span(name)
+
+class Tracer:
+  """
+  Collect timed spans per frame. Consecutive spans of the same phase
+  with nothing nested in them, like one raster span per dot, collapse
+  into one event with a count, so a trace stays a sensible size.
+  Spans nest per thread, so threads evaluating at once, like nn models
+  run from a thread pool, each charge time to their own spans.
+  """
+  frame: int
+
+  def __init__(self):
+    self.frame = 0
+    self.events = []
+    self._local = threading.local()
+
+  def _stack(self) -> list:
+    stack = getattr(self._local, 'stack', None)
+    if stack is None:
+      stack = self._local.stack = []
+    return stack
+
+  @contextmanager
+  def span(self, name: str):
+    stack = self._stack()
+    start = perf_counter()
+    child = [0.0, False]
+    stack.append(child)
+    try:
+      yield
+    finally:
+      duration = perf_counter()-start
+      stack.pop()
+      if stack:
+        stack[-1][0] += duration
+        stack[-1][1] = True
+      self._record(
+        name, start, duration, duration-child[0], child[1], len(stack))
+
+  def _record(self, name, start, duration, own, nested, depth):
+    tid = threading.get_native_id()
+    last = self.events[-1] if self.events else None
+    if (
+      not nested
+      and last is not None
+      and not last['nested']
+      and last['name'] == name
+      and last['depth'] == depth
+      and last['frame'] == self.frame
+      and last['tid'] == tid
+    ):
+      last['duration'] += duration
+      last['self'] += own
+      last['count'] += 1
+      return
+    self.events.append({
+      'name': name,
+      'start': start,
+      'duration': duration,
+      'self': own,
+      'count': 1,
+      'nested': nested,
+      'depth': depth,
+      'frame': self.frame,
+      'pid': os.getpid(),
+      'tid': tid,
+    })
+
+  def take(self) -> list:
+    """
+    Remove and return the events so far, e.g. to send them from a
+    worker process to the tracer of the render.
+    """
+    events = self.events
+    self.events = []
+    return events
+
+  def chrome(self) -> dict:
+    """
+    The events in Chrome's trace event format, for chrome://tracing or
+    https://ui.perfetto.dev.
+    """
+    return {
+      'traceEvents': [
+        {
+          'name': event['name'],
+          'ph': 'X',
+          'ts': 1e6*event['start'],
+          'dur': 1e6*event['duration'],
+          'pid': event['pid'],
+          'tid': event['tid'],
+          'args': {'frame': event['frame'], 'count': event['count']},
+        }
+        for event in self.events
+      ],
+      'displayTimeUnit': 'ms',
+    }
+
+  def write(self, path: str):
+    with open(path, 'w') as file:
+      json.dump(self.chrome(), file)
+
+  def summary(self) -> str:
+    """
+    A table of every phase: its share of the traced frames and its
+    time per frame, in total and excluding nested phases.
+    """
+    if not self.events:
+      return 'no spans traced'
+    frames = len({event['frame'] for event in self.events})
+    phases = {}
+    for event in self.events:
+      phase = phases.setdefault(event['name'], {})
+      total, own = phase.get(event['frame'], (0, 0))
+      phase[event['frame']] = (total+event['duration'], own+event['self'])
+    # Self times add up to the traced time, without double counting.
+    traced = sum(
+      own for phase in phases.values() for _, own in phase.values())
+    lines = [
+      f"{'phase':<10}{'self %':>8}{'self ms':>10}{'total ms':>10}"
+      f"{'p50 ms':>9}{'p95 ms':>9}",
+    ]
+    for name, phase in sorted(
+      phases.items(),
+      key=lambda item: -sum(own for _, own in item[1].values()),
+    ):
+      total = np.array([total for total, _ in phase.values()])
+      own = np.array([own for _, own in phase.values()])
+      lines.append(
+        f'{name:<10}{100*own.sum()/traced:>8.1f}'
+        f'{1000*own.sum()/frames:>10.2f}{1000*total.sum()/frames:>10.2f}'
+        f'{1000*np.percentile(total, 50):>9.2f}'
+        f'{1000*np.percentile(total, 95):>9.2f}'
+      )
+    lines.append(
+      f'{frames} frames; ms per frame, p50/p95 over frames with the phase')
+    return '\n'.join(lines)
+
+@contextmanager
+def profile(path: str = None):
+  """
+  Trace everything inside the block. Afterwards, write the trace to
+  path, if given, and print a summary to standard error, since
+  standard output may be carrying frames.
+  """
+  tracer = Tracer()
+  use_tracer(tracer)
+  try:
+    yield tracer
+  finally:
+    use_tracer(None)
+    if path is not None:
+      tracer.write(path)
+    print(tracer.summary(), file=sys.stderr)
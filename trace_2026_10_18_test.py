@@ -0,0 +1,44 @@
+import threading
+import trace_2026_10_18 as trace
+
+# Run with python -m pytest trace_2026_10_18_test.py.
+
+def test_spans_nest_and_collapse():
+  tracer = trace.Tracer()
+  with tracer.span('app'):
+    for _ in range(0, 3):
+      with tracer.span('raster'):
+        pass
+  raster, app = tracer.events
+  assert (raster['name'], raster['depth'], raster['count']) == ('raster', 1, 3)
+  assert (app['name'], app['depth'], app['nested']) == ('app', 0, True)
+  assert app['self'] < app['duration']
+
+def test_threads_nest_their_own_spans():
+  # A span opened on one thread while another is open on a second
+  # thread is neither nested in it nor charged to it.
+  tracer = trace.Tracer()
+  opened = threading.Event()
+  closed = threading.Event()
+
+  def outer():
+    with tracer.span('outer'):
+      opened.set()
+      closed.wait()
+
+  def inner():
+    opened.wait()
+    with tracer.span('inner'):
+      pass
+    closed.set()
+
+  threads = [threading.Thread(target=outer), threading.Thread(target=inner)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  events = {event['name']: event for event in tracer.events}
+  assert events['inner']['depth'] == 0
+  assert not events['outer']['nested']
+  assert events['outer']['self'] == events['outer']['duration']
+  assert events['inner']['tid'] != events['outer']['tid']